@@ -26,6 +26,10 @@ REQUIRED = [
 # What packages are optional?
 EXTRAS = {
     # 'fancy feature': ['django'],
+    # obs_type='torch_temporal' of the flow tasks
+    'temporal': ['torch_geometric_temporal'],
+    # Parquet caches of the freight flows and util.run results
+    'parquet': ['pyarrow'],
 }
 
 
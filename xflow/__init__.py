@@ -1,3 +1,21 @@
-import xflow.method
-import xflow.dataset
-import xflow.diffusion
+import importlib
+
+from xflow.compiled import CompiledGraph, compile_graph
+
+# Subpackages are imported on first access (PEP 562), so `import xflow`
+# does not pull in torch, ndlib or pandas until a loader or method needs them.
+_submodules = ['method', 'dataset', 'diffusion', 'util', 'flow_tasks', 'flow_store']
+
+
+def __getattr__(name):
+    if name in _submodules:
+        return importlib.import_module('xflow.' + name)
+    if name == 'xflow':
+        # `from . import xflow` in the scripts of the package, which the
+        # former eager `import xflow.method` made work
+        return importlib.import_module('xflow')
+    raise AttributeError(f"module 'xflow' has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + _submodules)
@@ -0,0 +1,208 @@
+import os
+import json
+import numpy as np
+
+
+def argsort(keys):
+    """
+    Stable argsort of non-negative integer keys. Below 2**31 keys and 2**32
+    positions, (key, position) pairs are packed into int64 and sorted by
+    value, which is much faster than np.argsort(kind='stable').
+    """
+    keys = np.asarray(keys)
+    if keys.size and (keys.size >= 1 << 32 or keys.min() < 0 or keys.max() >= 1 << 31):
+        return np.argsort(keys, kind='stable')
+    packed = np.sort((keys.astype(np.int64) << 32) | np.arange(keys.size, dtype=np.int64))
+    return packed & 0xFFFFFFFF
+
+
+class CompiledGraph:
+    """
+    A graph and its edge thresholds compiled once into CSR arrays.
+
+    Holds the out-adjacency (indptr, indices, weights), the reverse
+    adjacency (rindptr, rindices, rweights) and the node id <-> index
+    mapping. Undirected edges are stored in both directions. Every method
+    in xflow.method.im, xflow.method.ibm and xflow.diffusion accepts a
+    CompiledGraph in place of (g, config), so the O(E) walk over the ndlib
+    config only happens once.
+    """
+
+    def __init__(self, nodelist, indptr, indices, weights, directed=False):
+        self.nodelist = list(nodelist)
+        self.index = {node: i for i, node in enumerate(self.nodelist)}
+        self.directed = directed
+
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.weights = np.asarray(weights)
+
+        n = len(self.nodelist)
+        src = np.repeat(np.arange(n, dtype=np.int32), np.diff(self.indptr))
+        order = argsort(self.indices)
+        self.rindptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=n), out=self.rindptr[1:])
+        self.rindices = src[order]
+        self.rweights = self.weights[order]
+
+    @classmethod
+    def from_edges(cls, nodelist, src, dst, weights, directed=False):
+        """Build from parallel arrays of edge endpoints given as node indices."""
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+
+        if not directed:
+            loop = src == dst
+            src, dst = np.concatenate([src, dst[~loop]]), np.concatenate([dst, src[~loop]])
+            weights = np.concatenate([weights, weights[~loop]])
+
+        n = len(nodelist)
+        order = argsort(src)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+
+        return cls(nodelist, indptr, dst[order], weights[order], directed)
+
+    @classmethod
+    def from_networkx(cls, g, config=None):
+        """
+        Compile g with the thresholds of an ndlib config.
+        Without a config the 'weight' edge attribute is used.
+        """
+        nodelist = list(g.nodes())
+        index = {node: i for i, node in enumerate(nodelist)}
+
+        m = g.number_of_edges()
+        src = np.empty(m, dtype=np.int64)
+        dst = np.empty(m, dtype=np.int64)
+        weights = np.empty(m, dtype=np.float64)
+        if config is None:
+            for e, (a, b, w) in enumerate(g.edges(data='weight', default=1.0)):
+                src[e], dst[e], weights[e] = index[a], index[b], w
+        else:
+            threshold = config.config["edges"]['threshold']
+            for e, (a, b) in enumerate(g.edges()):
+                src[e], dst[e] = index[a], index[b]
+                weights[e] = threshold[(a, b)] if (a, b) in threshold else threshold[(b, a)]
+
+        return cls.from_edges(nodelist, src, dst, weights, g.is_directed())
+
+    # networkx-like accessors, so callers that only list nodes keep working
+    def nodes(self):
+        return list(self.nodelist)
+
+    def number_of_nodes(self):
+        return len(self.nodelist)
+
+    def number_of_edges(self):
+        if self.directed:
+            return len(self.indices)
+        loops = np.count_nonzero(self.indices == np.repeat(np.arange(self.n), np.diff(self.indptr)))
+        return (len(self.indices) + loops) // 2
+
+    def is_directed(self):
+        return self.directed
+
+    @property
+    def n(self):
+        return len(self.nodelist)
+
+    def out_degree(self):
+        return np.diff(self.indptr)
+
+    def in_degree(self):
+        return np.diff(self.rindptr)
+
+    def labels(self, idx):
+        """Node ids of the given node indices."""
+        return [self.nodelist[i] for i in idx]
+
+    def to_scipy(self, weighted=True):
+        """Adjacency as a scipy.sparse CSR array, like nx.adjacency_matrix."""
+        import scipy.sparse as sp
+        data = self.weights if weighted else np.ones(len(self.indices))
+        # copied, scipy may sort the indices of the matrix in place
+        return sp.csr_array((data, self.indices, self.indptr), shape=(self.n, self.n), copy=True)
+
+    def subgraph(self, keep):
+        """Compiled subgraph induced by the boolean node mask keep."""
+        keep = np.asarray(keep, dtype=bool)
+        src = np.repeat(np.arange(self.n), np.diff(self.indptr))
+        live = keep[src] & keep[self.indices]
+
+        relabel = np.cumsum(keep) - 1
+        nodelist = [node for node, k in zip(self.nodelist, keep) if k]
+        indptr = np.zeros(len(nodelist) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(relabel[src[live]], minlength=len(nodelist)), out=indptr[1:])
+
+        return CompiledGraph(nodelist, indptr, relabel[self.indices[live]], self.weights[live], self.directed)
+
+    # arrays written by save, one .npy file each
+    _arrays = ('indptr', 'indices', 'weights', 'rindptr', 'rindices', 'rweights')
+
+    def save(self, path, compact=False, meta=None):
+        """
+        Write the graph to the directory path: one .npy file per CSR array
+        plus the node ids, so load can memory-map it back. compact stores
+        indptr as int32 when the arcs fit and the weights as float32, about
+        half the size; meta is added to the metadata in graph.json.
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in self._arrays:
+            array = getattr(self, name)
+            if compact and name in ('indptr', 'rindptr') and len(self.indices) < 2**31:
+                array = np.asarray(array, dtype=np.int32)
+            elif compact and name in ('weights', 'rweights'):
+                array = np.asarray(array, dtype=np.float32)
+            np.save(os.path.join(path, name + '.npy'), array)
+        nodes = np.asarray(self.nodelist)
+        if nodes.tolist() != self.nodelist:
+            # mixed node types, kept as objects
+            nodes = np.array(self.nodelist, dtype=object)
+        np.save(os.path.join(path, 'nodes.npy'), nodes)
+        with open(os.path.join(path, 'graph.json'), 'w') as f:
+            json.dump(dict(meta or {}, directed=self.directed, nodes=self.n, arcs=len(self.indices)), f, default=repr)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """
+        Open a graph written by save, its arrays memory-mapped. The
+        metadata of graph.json is kept in meta.
+        """
+        with open(os.path.join(path, 'graph.json')) as f:
+            meta = json.load(f)
+        cg = cls.__new__(cls)
+        cg.nodelist = np.load(os.path.join(path, 'nodes.npy'), allow_pickle=True).tolist()
+        cg.index = {node: i for i, node in enumerate(cg.nodelist)}
+        cg.directed = meta['directed']
+        cg.meta = meta
+        for name in cls._arrays:
+            setattr(cg, name, np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode))
+        if mmap_mode == 'r':
+            cg._path = os.path.abspath(path)
+        return cg
+
+    def __getstate__(self):
+        # a read-only mapped graph is pickled as its directory, so worker
+        # processes map the same files and share one copy in the page cache
+        path = self.__dict__.get('_path')
+        if path is not None:
+            return {'_path': path}
+        return self.__dict__
+
+    def __setstate__(self, state):
+        if list(state) == ['_path']:
+            state = CompiledGraph.load(state['_path']).__dict__
+        self.__dict__.update(state)
+
+    def __repr__(self):
+        kind = 'directed' if self.directed else 'undirected'
+        return f"CompiledGraph({kind}, {self.n} nodes, {len(self.indices)} arcs)"
+
+
+def compile_graph(g, config=None):
+    """Return g as a CompiledGraph, compiling it from (g, config) if needed."""
+    if isinstance(g, CompiledGraph):
+        return g
+    return CompiledGraph.from_networkx(g, config)
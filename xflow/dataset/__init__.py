@@ -1 +1,22 @@
-__all__ = ['connSW', 'BA', 'ER', 'CiteSeer', 'PubMed', 'Cora', 'photo', 'coms']
+import importlib
+
+__all__ = ['connSW', 'BA', 'ER', 'CiteSeer', 'PubMed', 'Cora', 'photo', 'coms', 'load_graph']
+
+# loaders are imported from their module on first access (PEP 562), so the
+# networkx datasets do not import torch_geometric
+_loaders = {'connSW': 'nx', 'BA': 'nx', 'ER': 'nx',
+            'CiteSeer': 'pyg', 'PubMed': 'pyg', 'Cora': 'pyg', 'photo': 'pyg', 'coms': 'pyg',
+            'load_graph': 'loader'}
+_submodules = ['cache', 'download', 'eurostat', 'faf', 'konect', 'loader', 'nx', 'pyg', 'snap']
+
+
+def __getattr__(name):
+    if name in _loaders:
+        return getattr(importlib.import_module('xflow.dataset.' + _loaders[name]), name)
+    if name in _submodules:
+        return importlib.import_module('xflow.dataset.' + name)
+    raise AttributeError(f"module 'xflow.dataset' has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_loaders) + _submodules)
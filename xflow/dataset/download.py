@@ -0,0 +1,160 @@
+import os
+import bz2
+import gzip
+import zlib
+import hashlib
+import zipfile
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+from xflow.dataset.cache import cache_dir
+
+# Dataset downloads.
+#
+# Files are streamed to <path>.part in chunks and renamed once complete, so
+# an interrupted download resumes from the bytes already on disk with an
+# HTTP range request. Every finished file is checked against its SHA-256:
+# the one passed in or listed in SHA256, or else the digest recorded in
+# <path>.sha256 when the file was first downloaded. A file without a known
+# digest must at least decompress to its end (.gz, .bz2, .zip) before its
+# digest is recorded. The record also holds the size and modification time
+# of the file, and the file is hashed again only when they change.
+
+# known SHA-256 digests by file name; add a digest here once it has been
+# checked against a copy from the source
+SHA256 = {}
+
+
+def data_dir(source, path=None):
+    """Directory of the downloads of source ('snap', 'konect', ...) in the cache."""
+    folder = os.path.join(cache_dir(path), source)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def session(workers=4):
+    """A requests session pooling up to workers connections per host."""
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=3)
+    s.mount('http://', adapter)
+    s.mount('https://', adapter)
+    return s
+
+
+def sha256sum(filename, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _recorded(path):
+    # digest and (size, mtime_ns) of path in its .sha256 record; records of
+    # older versions hold the digest only
+    if not os.path.exists(path + '.sha256'):
+        return None, None
+    with open(path + '.sha256') as f:
+        fields = f.read().split()
+    stamp = tuple(map(int, fields[1:3])) if len(fields) == 3 else None
+    return (fields[0] if fields else None), stamp
+
+
+def _record(path, digest):
+    stat = os.stat(path)
+    with open(path + '.sha256', 'w') as f:
+        f.write(f"{digest} {stat.st_size} {stat.st_mtime_ns}")
+
+
+def _intact(filename, name=None):
+    # whether a compressed file, in the format of its name, reads to its end
+    name = name or filename
+    try:
+        if name.endswith('.zip'):
+            with zipfile.ZipFile(filename) as archive:
+                return archive.testzip() is None
+        if name.endswith('.gz'):
+            f = gzip.open(filename, 'rb')
+        elif name.endswith('.bz2'):
+            f = bz2.open(filename, 'rb')
+        else:
+            return True
+        with f:
+            while f.read(1 << 20):
+                pass
+        return True
+    except (OSError, EOFError, zlib.error, zipfile.BadZipFile):
+        return False
+
+
+def download(url, path, sha256=None, session=None, chunk_size=1 << 20, timeout=60):
+    """
+    Download url to path unless a verified copy is there already, resuming
+    a partial download. Raises ValueError when the SHA-256 does not match,
+    or without a known digest when the file does not decompress, leaving
+    no file behind. Returns path.
+    """
+    recorded, stamp = _recorded(path)
+    expected = sha256 or SHA256.get(os.path.basename(path)) or recorded
+    if os.path.exists(path):
+        stat = os.stat(path)
+        if expected is not None and expected == recorded and stamp == (stat.st_size, stat.st_mtime_ns):
+            # verified before and not changed since
+            return path
+        if expected is not None and sha256sum(path) == expected:
+            _record(path, expected)
+            return path
+        if expected is None and _intact(path):
+            _record(path, sha256sum(path))
+            return path
+        print(f"{path} is corrupted. Re-downloading...")
+        os.remove(path)
+
+    print(f"Downloading {path}...")
+    get = (session or requests).get
+    part = path + '.part'
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    headers = {'Range': f'bytes={offset}-'} if offset else {}
+
+    digest = hashlib.sha256()
+    with get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 416:
+            # the partial file already holds every byte
+            mode = None
+        elif response.status_code == 206:
+            mode = 'ab'
+        else:
+            response.raise_for_status()
+            mode, offset = 'wb', 0
+
+        if offset:
+            with open(part, 'rb') as f:
+                for chunk in iter(lambda: f.read(chunk_size), b''):
+                    digest.update(chunk)
+        if mode is not None:
+            with open(part, mode) as f:
+                for chunk in response.iter_content(chunk_size):
+                    digest.update(chunk)
+                    f.write(chunk)
+
+    if expected is not None and digest.hexdigest() != expected:
+        os.remove(part)
+        raise ValueError(f"SHA-256 mismatch for {url}: got {digest.hexdigest()}, expected {expected}")
+    if expected is None and not _intact(part, path):
+        os.remove(part)
+        raise ValueError(f"{url} did not download as a complete {os.path.splitext(path)[1]} file")
+    os.replace(part, path)
+    _record(path, digest.hexdigest())
+    return path
+
+
+def download_many(files, workers=4):
+    """
+    Download (url, path) or (url, path, sha256) items concurrently over one
+    pooled session. Returns the paths in the order of files.
+    """
+    s = session(workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(download, *item, session=s) for item in files]
+        return [future.result() for future in futures]
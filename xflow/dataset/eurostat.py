@@ -1,58 +1,79 @@
+import os
 import pandas as pd
 import networkx as nx
 import requests
-from io import BytesIO, StringIO
+from io import BytesIO
 import gzip
 
-def eurostat_road_go_ta_tg():
-    # URL of the Eurostat TSV file (compressed)
-    eurostat_url = "https://ec.europa.eu/eurostat/api/dissemination/sdmx/2.1/data/road_go_ta_tg/?format=TSV&compressed=true"
+from xflow.compiled import CompiledGraph
+from xflow.dataset.cache import read_table, write_table
+from xflow.dataset.download import data_dir
 
-    # Download the TSV file
-    response = requests.get(eurostat_url)
-    data = gzip.decompress(response.content).decode('utf-8')
-    data_io = StringIO(data)
+metadata = ['freq', 'tra_type', 'nst07', 'unit', 'geo']
 
+def read_flows(tsv_file):
+    """
+    The flows of a road_go_ta_tg TSV as a (geo, year, weight) table, one
+    row per geo and year with the value of the last series listing it.
+    Missing values (':') are dropped and flags ('p', 'e', ...) stripped.
+    """
     # Read the TSV file into a DataFrame with appropriate settings
-    eurostat_df = pd.read_csv(data_io, delimiter='\t', on_bad_lines='skip')
-
-    # Inspect the dataframe to understand its structure
-    print(eurostat_df.head())
-    print(eurostat_df.columns)
+    eurostat_df = pd.read_csv(tsv_file, delimiter='\t', on_bad_lines='skip', dtype=str)
 
     # Split the first column into multiple columns
     metadata_columns = eurostat_df.iloc[:, 0].str.split(',', expand=True)
-    metadata_columns.columns = ['freq', 'tra_type', 'nst07', 'unit', 'geo']
+    metadata_columns.columns = metadata
 
     # Combine metadata columns with the data columns
     eurostat_df = pd.concat([metadata_columns, eurostat_df.iloc[:, 1:]], axis=1)
 
     # Melt the DataFrame to have a long format
-    eurostat_df = eurostat_df.melt(id_vars=['freq', 'tra_type', 'nst07', 'unit', 'geo'], 
-                                   var_name='year', 
-                                   value_name='value')
+    eurostat_df = eurostat_df.melt(id_vars=metadata, var_name='year', value_name='value')
 
-    # Filter out rows with missing values
-    eurostat_df.dropna(subset=['value'], inplace=True)
+    # numeric part of the value, NaN for missing ones
+    eurostat_df['weight'] = pd.to_numeric(eurostat_df['value'].str.extract(r'(-?[\d.]+)', expand=False),
+                                          errors='coerce')
+    eurostat_df = eurostat_df.dropna(subset=['weight'])
 
     # Convert year to a proper format
     eurostat_df['year'] = eurostat_df['year'].str.strip()
 
-    # Display the cleaned DataFrame
-    print(eurostat_df.head())
+    # Using 'geo' as origin and 'year' as destination, and 'weight' as weight
+    flows = eurostat_df.groupby(['geo', 'year'], sort=False)['weight'].last()
+    return flows.reset_index()
 
-    # Initialize a directed graph
-    G = nx.DiGraph()
+def flows(path=None):
+    """
+    The road_go_ta_tg table of read_flows, downloaded once and cached as
+    Parquet in the eurostat data directory when a Parquet engine is installed.
+    """
+    filename = os.path.join(data_dir('eurostat', path), "road_go_ta_tg.parquet")
+    eurostat_df = read_table(filename)
+    if eurostat_df is not None:
+        return eurostat_df
+
+    # URL of the Eurostat TSV file (compressed)
+    eurostat_url = "https://ec.europa.eu/eurostat/api/dissemination/sdmx/2.1/data/road_go_ta_tg/?format=TSV&compressed=true"
+    response = requests.get(eurostat_url)
+    response.raise_for_status()
+    # decompressed while it is parsed, without a copy of the text
+    with gzip.GzipFile(fileobj=BytesIO(response.content)) as tsv_file:
+        eurostat_df = read_flows(tsv_file)
 
-    # Example: Using 'geo' as origin and 'year' as destination, and 'value' as weight
-    for index, row in eurostat_df.iterrows():
-        origin = row['geo']
-        destination = row['year']
-        weight = row['value']
+    write_table(eurostat_df, filename)
+    return eurostat_df
 
-        # Add edge with weight
-        G.add_edge(origin, destination, weight=weight)
+def to_graph(eurostat_df, format='networkx'):
+    """A directed geo -> year graph of a flow table weighted by its values."""
+    if format == 'csr':
+        codes, nodes = pd.factorize(pd.concat([eurostat_df['geo'], eurostat_df['year']], ignore_index=True))
+        m = len(eurostat_df)
+        return CompiledGraph.from_edges(nodes.tolist(), codes[:m], codes[m:], eurostat_df['weight'].to_numpy(),
+                                        directed=True)
+    return nx.from_pandas_edgelist(eurostat_df, 'geo', 'year', edge_attr='weight', create_using=nx.DiGraph)
 
+def eurostat_road_go_ta_tg(format='networkx'):
+    G = to_graph(flows(), format)
     print(f"eurostat_road_go_ta_tg has {G.number_of_nodes()} nodes and {G.number_of_edges()} edges.")
     return G
 
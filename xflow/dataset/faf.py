@@ -1,51 +1,64 @@
+import os
 import pandas as pd
 import networkx as nx
 import requests
 from zipfile import ZipFile
 from io import BytesIO
 
-def faf5_6():
+from xflow.compiled import CompiledGraph
+from xflow.dataset.cache import read_table, write_table
+from xflow.dataset.download import data_dir
+
+# Adjust column names based on actual data structure
+origin_col = 'dms_orig'  # Origin column
+destination_col = 'dms_dest'  # Destination column
+
+def read_flows(csv_file, year=2017):
+    """
+    Origin-destination flows of a FAF5 CSV: the tons of year summed over
+    commodities and modes for every (dms_orig, dms_dest) pair, in the
+    order the pairs first appear.
+    """
+    weight_col = f'tons_{year}'
+    # only the three columns are parsed; zone ids fit in int16
+    faf_df = pd.read_csv(csv_file, usecols=[origin_col, destination_col, weight_col],
+                         dtype={origin_col: 'int16', destination_col: 'int16', weight_col: 'float64'})
+    flows = faf_df.groupby([origin_col, destination_col], sort=False)[weight_col].sum()
+    return flows.reset_index().rename(columns={weight_col: 'weight'})
+
+def flows(year=2017, path=None):
+    """
+    The FAF5.6 flow table of read_flows, downloaded once and cached as
+    Parquet in the faf data directory when a Parquet engine is installed.
+    """
+    filename = os.path.join(data_dir('faf', path), f"FAF5.6_{year}.parquet")
+    faf_df = read_table(filename)
+    if faf_df is not None:
+        return faf_df
+
     # URL of the CSV file within the ZIP archive
     zip_url = "https://faf.ornl.gov/faf5/data/download_files/FAF5.6.zip"
-
-    # Download the ZIP file
     response = requests.get(zip_url)
-    zip_content = response.content
-
-    # Save the ZIP file to disk (optional)
-    with open("FAF5.6.zip", "wb") as zip_file:
-        zip_file.write(zip_content)
-
-    # Open the saved ZIP file
-    with ZipFile("FAF5.6.zip", 'r') as zip_file:
-        # Extract the relevant CSV file from the ZIP archive
-        csv_file = zip_file.open("FAF5.6.csv")
-        
-        # Read the CSV file into a DataFrame
-        faf_df = pd.read_csv(csv_file)
-
-    # Inspect the dataframe to understand its structure
-    print(faf_df.head())
-    print(faf_df.columns)
-
-    # Adjust column names based on actual data structure
-    origin_col = 'dms_orig'  # Origin column
-    destination_col = 'dms_dest'  # Destination column
-    weight_col = 'tons_2017'  # Weight column for the year 2017 
-    # TODO (adjust year as needed)
-
-    # Initialize a directed graph
-    G = nx.DiGraph()
-
-    # Add edges to the graph from the DataFrame
-    for index, row in faf_df.iterrows():
-        origin = row[origin_col]
-        destination = row[destination_col]
-        weight = row[weight_col]
-
-        # Add edge with weight
-        G.add_edge(origin, destination, weight=weight)
+    response.raise_for_status()
+
+    # the CSV is read straight from the archive in memory
+    with ZipFile(BytesIO(response.content), 'r') as zip_file:
+        with zip_file.open("FAF5.6.csv") as csv_file:
+            faf_df = read_flows(csv_file, year)
+
+    write_table(faf_df, filename)
+    return faf_df
+
+def to_graph(faf_df, format='networkx'):
+    """A directed graph of a flow table weighted by its tons."""
+    if format == 'csr':
+        codes, nodes = pd.factorize(pd.concat([faf_df[origin_col], faf_df[destination_col]], ignore_index=True))
+        m = len(faf_df)
+        return CompiledGraph.from_edges(nodes.tolist(), codes[:m], codes[m:], faf_df['weight'].to_numpy(), directed=True)
+    return nx.from_pandas_edgelist(faf_df, origin_col, destination_col, edge_attr='weight', create_using=nx.DiGraph)
 
+def faf5_6(year=2017, format='networkx'):
+    G = to_graph(flows(year), format)
     print(f"faf5_6 has {G.number_of_nodes()} nodes and {G.number_of_edges()} edges.")
 
     return G
@@ -1,29 +1,22 @@
 import os
 import networkx as nx
-import requests
 import random
 import tarfile
 import ndlib.models.ModelConfig as mc
 
+from xflow.dataset import download
+
 def create_folder(folder_name):
     if not os.path.exists(folder_name):
         os.makedirs(folder_name)
 
 def download_konect_dataset(url, filename):
-    response = requests.get(url)
-    if response.status_code == 200:
-        with open(filename, 'wb') as f:
-            f.write(response.content)
-    else:
-        raise ValueError(f"Failed to download the dataset from {url}")
+    download.download(url, filename)
 
 def check_and_download(url, filename):
-    create_folder("konect_datasets")
-    if not os.path.exists(filename):
-        print(f"Downloading {filename}...")
-        download_konect_dataset(url, filename)
-    else:
-        print(f"{filename} already exists.")
+    # streamed with resume and checked against its SHA-256, see
+    # xflow.dataset.download; files live in the konect cache directory
+    download.download(url, filename)
 
 def extract_tar_bz2(filename, extract_path):
     if not os.path.exists(extract_path):
@@ -57,8 +50,8 @@ def load_graph(filename):
 
 def chesapeake_bay():
     url = "http://www.konect.cc/files/download.tsv.dimacs10-chesapeake.tar.bz2"
-    tar_filename = "konect_datasets/dimacs10-chesapeake.tar.bz2"
-    extract_path = "konect_datasets/dimacs10-chesapeake"
+    tar_filename = os.path.join(download.data_dir('konect'), "dimacs10-chesapeake.tar.bz2")
+    extract_path = os.path.join(download.data_dir('konect'), "dimacs10-chesapeake")
     check_and_download(url, tar_filename)
     extract_tar_bz2(tar_filename, extract_path)
     tsv_filename = os.path.join(extract_path, "dimacs10-chesapeake/out.dimacs10-chesapeake")
@@ -66,8 +59,8 @@ def chesapeake_bay():
 
 def infectious():
     url = "http://www.konect.cc/files/download.tsv.infectious.tar.bz2"
-    tar_filename = "konect_datasets/infectious.tar.bz2"
-    extract_path = "konect_datasets/infectious"
+    tar_filename = os.path.join(download.data_dir('konect'), "infectious.tar.bz2")
+    extract_path = os.path.join(download.data_dir('konect'), "infectious")
     check_and_download(url, tar_filename)
     extract_tar_bz2(tar_filename, extract_path)
     tsv_filename = os.path.join(extract_path, "sociopatterns-infectious/out.sociopatterns-infectious")
@@ -0,0 +1,51 @@
+import importlib
+import inspect
+
+from xflow.dataset import cache
+
+# Datasets by name.
+#
+# load_graph looks a dataset up here and, with the csr backend, goes through
+# the graph cache: the first call builds the graph and saves it in the
+# compact format (int32 CSR, float32 weights, node ids and metadata in
+# graph.json), later calls and other processes memory-map those files.
+
+# module of every dataset loader
+datasets = {
+    'connSW': 'nx', 'BA': 'nx', 'ER': 'nx',
+    'CiteSeer': 'pyg', 'PubMed': 'pyg', 'Cora': 'pyg', 'photo': 'pyg', 'coms': 'pyg',
+    'email_eu_core': 'pyg', 'reddit': 'pyg', 'last_fm': 'pyg', 'bitcoin_otc': 'pyg', 'polblogs': 'pyg',
+    'myket': 'pyg', 'karate_club': 'pyg',
+    'soc_epinions1': 'snap', 'soc_livejournal1': 'snap', 'wiki_vote': 'snap', 'email_euall': 'snap',
+    'email_enron': 'snap', 'wiki_talk': 'snap', 'cit_hepph': 'snap', 'cit_hepth': 'snap', 'cit_patents': 'snap',
+    'sx_stackoverflow': 'snap', 'sx_mathoverflow': 'snap', 'sx_superuser': 'snap', 'sx_askubuntu': 'snap',
+    'wiki_talk_temporal': 'snap', 'email_eu_core_temporal': 'snap', 'college_msg': 'snap',
+    'chesapeake_bay': 'konect', 'infectious': 'konect',
+}
+
+
+def loader(name):
+    """The loader function of a dataset name."""
+    if name not in datasets:
+        raise ValueError(f"Unknown dataset {name!r}, expected one of {sorted(datasets)}")
+    return getattr(importlib.import_module('xflow.dataset.' + datasets[name]), name)
+
+
+def load_graph(name, backend='csr', seed=0, path=None, **params):
+    """
+    Load the dataset name with its loader parameters params.
+
+    backend='csr' returns (CompiledGraph, None), memory-mapped from the
+    cache and built on the first call with random and np.random seeded
+    with seed; loaders with a format='csr' path are called with it, so no
+    networkx graph is built. backend='networkx' calls the loader and
+    returns its (g, config).
+    """
+    fn = loader(name)
+    if backend == 'networkx':
+        return fn(**params)
+    if backend != 'csr':
+        raise ValueError(f"Unknown backend {backend!r}, expected 'csr' or 'networkx'")
+    if 'format' in inspect.signature(fn).parameters:
+        params = dict(params, format='csr')
+    return cache.load(fn, seed, path, compact=True, **params)
@@ -1,6 +1,5 @@
 import networkx as nx
 import random
-import ndlib.models.epidemics as ep
 import ndlib.models.ModelConfig as mc
 
 
@@ -1,16 +1,17 @@
 import networkx as nx
 import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
 import torch_geometric.datasets as ds
 import random
-import ndlib
-import ndlib.models.epidemics as ep
 import ndlib.models.ModelConfig as mc
-import torch_geometric
 
 from torch_geometric.datasets import Planetoid, EmailEUCore, MyketDataset, BitcoinOTC, PolBlogs, KarateClub
 from torch_geometric.utils import to_networkx
 
-print(torch_geometric.__version__)
+from xflow.compiled import CompiledGraph
+from xflow.diffusion import engine
 
 def convert_to_graph(dataset):
     data = dataset[0]
@@ -43,6 +44,58 @@ def convert_temporal_to_graph_attr(data):
     
     return G
 
+def _edges(data):
+    # edge endpoints of a dataset as numpy arrays
+    if hasattr(data, 'src') and hasattr(data, 'dst'):
+        return data.src.numpy(), data.dst.numpy()
+    if hasattr(data, 'edge_index') and data.edge_index is not None:
+        return data.edge_index[0].numpy(), data.edge_index[1].numpy()
+    raise AttributeError("The dataset does not have expected edge attributes.")
+
+def _uniform(min_weight, max_weight):
+    return lambda rng, m: np.round(rng.uniform(min_weight, max_weight, size=m), 2)
+
+def _percent(low, high):
+    # like round(random.randrange(low, high) / 100, 2)
+    return lambda rng, m: np.round(rng.integers(low, high, size=m) / 100, 2)
+
+def edge_index_to_csr(src, dst, directed=False, weights=_uniform(0.1, 0.5), num_nodes=None, relabel=True,
+                      largest_component=False, random_state=None):
+    """
+    The graph of the edges src -> dst as a CompiledGraph, the same graph
+    the networkx path of a loader builds but without a networkx graph or
+    per-edge Python. Nodes are the ids in src and dst in order of first
+    appearance (range(num_nodes) if given), relabelled 0..n-1 with relabel.
+    Duplicate edges are dropped, undirected edges symmetrized, and all
+    weights drawn in one weights(rng, m) call.
+    """
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    if num_nodes is None:
+        # first appearance in (src0, dst0, src1, ...), like nx.from_edgelist
+        codes, ids = pd.factorize(np.column_stack([src, dst]).reshape(-1))
+        src, dst = codes[0::2], codes[1::2]
+    else:
+        ids = np.arange(num_nodes)
+    n = len(ids)
+
+    if not directed:
+        src, dst = np.minimum(src, dst), np.maximum(src, dst)
+    key = engine.unique(src * n + dst)
+    src, dst = key // n, key % n
+
+    if largest_component:
+        adj = sp.coo_array((np.ones(len(key)), (src, dst)), shape=(n, n))
+        _, labels = connected_components(adj, directed=False)
+        keep = labels == np.bincount(labels).argmax()
+        index = np.cumsum(keep) - 1
+        inside = keep[src]
+        src, dst, ids = index[src[inside]], index[dst[inside]], ids[keep]
+
+    nodelist = list(range(len(ids))) if relabel else ids.tolist()
+    rng = engine.check_random_state(random_state)
+    return CompiledGraph.from_edges(nodelist, src, dst, weights(rng, len(src)), directed)
+
 def add_edge_weights(G, min_weight, max_weight):
     config = mc.Configuration()
     for a, b in G.edges():
@@ -52,9 +105,11 @@ def add_edge_weights(G, min_weight, max_weight):
         G[a][b]['weight'] = weight
     return G, config
     
-def CiteSeer():
+def CiteSeer(format='networkx'):
     dataset = Planetoid(root='./Planetoid', name='CiteSeer')  # Cora, CiteSeer, PubMed
     data = dataset[0]
+    if format == 'csr':
+        return edge_index_to_csr(*_edges(data), weights=_percent(40, 80), relabel=False, largest_component=True), None
     edges = (data.edge_index.numpy()).T.tolist()
     G = nx.from_edgelist(edges)
 
@@ -70,9 +125,11 @@ def CiteSeer():
 
     return g, config
 
-def PubMed():
+def PubMed(format='networkx'):
     dataset = Planetoid(root='./Planetoid', name='PubMed')  # Cora, CiteSeer, PubMed
     data = dataset[0]
+    if format == 'csr':
+        return edge_index_to_csr(*_edges(data), weights=_percent(40, 80), relabel=False, largest_component=True), None
     edges = (data.edge_index.numpy()).T.tolist()
     G = nx.from_edgelist(edges)
 
@@ -88,9 +145,11 @@ def PubMed():
 
     return g, config
 
-def Cora():
+def Cora(format='networkx'):
     dataset = Planetoid(root='./Planetoid', name='Cora')  # Cora, CiteSeer, PubMed
     data = dataset[0]
+    if format == 'csr':
+        return edge_index_to_csr(*_edges(data), weights=_percent(40, 80), relabel=False, largest_component=True), None
     edges = (data.edge_index.numpy()).T.tolist()
     G = nx.from_edgelist(edges)
 
@@ -106,9 +165,11 @@ def Cora():
 
     return g, config
 
-def photo():
+def photo(format='networkx'):
     dataset = ds.Amazon(root='./geo', name = 'Photo')
     data = dataset[0]
+    if format == 'csr':
+        return edge_index_to_csr(*_edges(data), weights=_percent(5, 20)), None
     edges = (data.edge_index.numpy()).T.tolist()
     G = nx.from_edgelist(edges)
     g = nx.convert_node_labels_to_integers(G, first_label=0, ordering='default', label_attribute=None)
@@ -123,9 +184,11 @@ def photo():
 
     return g, config
 
-def coms():
+def coms(format='networkx'):
     dataset = ds.Amazon(root='./geo', name = 'Computers')
     data = dataset[0]
+    if format == 'csr':
+        return edge_index_to_csr(*_edges(data), weights=_percent(5, 20)), None
     edges = (data.edge_index.numpy()).T.tolist()
     G = nx.from_edgelist(edges)
     g = nx.convert_node_labels_to_integers(G, first_label=0, ordering='default', label_attribute=None)
@@ -140,55 +203,69 @@ def coms():
 
     return g, config
 
-def email_eu_core():
+def email_eu_core(format='networkx'):
     dataset = EmailEUCore(root='./EmailEUCore')
+    if format == 'csr':
+        return edge_index_to_csr(*_edges(dataset[0])), None
     G = convert_to_graph(dataset)
     G = nx.convert_node_labels_to_integers(G, first_label=0)
     G, config = add_edge_weights(G, 0.1, 0.5)
     return G, config
 
-def reddit():
+def reddit(format='networkx'):
     dataset = ds.JODIEDataset(root='./JODIE', name='Reddit')
+    if format == 'csr':
+        return edge_index_to_csr(*_edges(dataset[0]), directed=True), None
     G = convert_temporal_to_graph(dataset)
     G = nx.convert_node_labels_to_integers(G, first_label=0)
     G, config = add_edge_weights(G, 0.1, 0.5)
     return G, config
 
-def last_fm():
+def last_fm(format='networkx'):
     dataset = ds.JODIEDataset(root='./JODIE', name='LastFM')
+    if format == 'csr':
+        return edge_index_to_csr(*_edges(dataset[0]), directed=True), None
     G = convert_temporal_to_graph(dataset)
     G = nx.convert_node_labels_to_integers(G, first_label=0)
     G, config = add_edge_weights(G, 0.1, 0.5)
     return G, config
 
-def bitcoin_otc():
+def bitcoin_otc(format='networkx'):
     dataset = BitcoinOTC(root='./BitcoinOTC')
     data = dataset[0]
     if data.edge_index is None:
         raise ValueError("The edge_index is None for BitcoinOTC dataset")
+    if format == 'csr':
+        return edge_index_to_csr(*_edges(data), directed=True), None
     G = convert_temporal_to_graph_attr(data)
     G = nx.convert_node_labels_to_integers(G, first_label=0)
     G, config = add_edge_weights(G, 0.1, 0.5)
     return G, config
 
-def polblogs():
+def polblogs(format='networkx'):
     dataset = PolBlogs(root='./PolBlogs')
+    if format == 'csr':
+        return edge_index_to_csr(*_edges(dataset[0])), None
     data = dataset[0]
     G = convert_to_graph(dataset)
     G = nx.convert_node_labels_to_integers(G, first_label=0)
     G, config = add_edge_weights(G, 0.1, 0.5)
     return G, config
 
-def myket():
+def myket(format='networkx'):
     dataset = MyketDataset(root='./Myket')
+    if format == 'csr':
+        return edge_index_to_csr(*_edges(dataset[0]), directed=True), None
     G = convert_temporal_to_graph(dataset)
     G = nx.convert_node_labels_to_integers(G, first_label=0)
     G, config = add_edge_weights(G, 0.1, 0.5)
     return G, config
 
-def karate_club():
+def karate_club(format='networkx'):
     dataset = KarateClub()
     data = dataset[0]
+    if format == 'csr':
+        return edge_index_to_csr(*_edges(data), num_nodes=data.num_nodes), None
     G = to_networkx(data, to_undirected=True)
     G, config = add_edge_weights(G, 0.1, 0.5)
     return G, config
@@ -1,9 +1,17 @@
 import os
 import networkx as nx
-import requests
 import random
 import ndlib.models.ModelConfig as mc
 import gzip
+import tempfile
+import shutil
+import numpy as np
+import pandas as pd
+
+from xflow.compiled import CompiledGraph, argsort
+from xflow.diffusion import engine
+from xflow.dataset import download
+from xflow.dataset.cache import key as cache_key
 
 # TODO add CAIDA 
 # https://snap.stanford.edu/data/as-caida.html
@@ -13,21 +21,12 @@ def create_folder(folder_name):
         os.makedirs(folder_name)
 
 def download_snap_dataset(url, filename):
-    response = requests.get(url)
-    with open(filename, 'wb') as f:
-        f.write(response.content)
+    download.download(url, filename)
 
 def check_and_download(url, filename):
-    create_folder("snap_datasets")  # Ensure the folder is created
-    if not os.path.exists(filename):
-        print(f"Downloading {filename}...")
-        download_snap_dataset(url, filename)
-    try:
-        with gzip.open(filename, 'rt') as f:
-            f.read(1)
-    except (OSError, gzip.BadGzipFile):
-        print(f"{filename} is corrupted. Re-downloading...")
-        download_snap_dataset(url, filename)
+    # streamed with resume and checked against its SHA-256, see
+    # xflow.dataset.download; files live in the snap cache directory
+    download.download(url, filename)
 
 def add_edge_weights(G, min_weight, max_weight):
     config = mc.Configuration()
@@ -43,65 +42,144 @@ def load_graph(filename):
     G, config = add_edge_weights(G, 0.1, 0.5)
     return G, config
 
-def soc_epinions1():
+def read_edges(filename, chunksize=1 << 22):
+    """
+    Stream the first two columns of a (gzipped) whitespace separated edge
+    list as int64 (src, dst) arrays of up to chunksize edges, skipping
+    '#' comments. Extra columns such as timestamps are ignored.
+    """
+    reader = pd.read_csv(filename, sep=r'\s+', comment='#', header=None, usecols=[0, 1],
+                         dtype=np.int64, chunksize=chunksize)
+    for chunk in reader:
+        yield chunk[0].to_numpy(), chunk[1].to_numpy()
+
+def load_csr(filename, directed=False, min_weight=0.1, max_weight=0.5, random_state=None, cache=True):
+    """
+    Load an edge list as a CompiledGraph without building a networkx graph.
+    Node ids are relabelled to contiguous indices (the ids are the
+    nodelist), duplicate edges are dropped like nx.Graph does, and the
+    weights are drawn in one call, uniform in [min_weight, max_weight] and
+    rounded to 2 decimals. With cache the graph is saved next to the file
+    under filename + '.csr-<key>', the key hashing directed, the weight
+    range and random_state, and memory-mapped on later calls with the same
+    parameters; with random_state=None those reuse the first weights.
+    """
+    params = {'directed': directed, 'min_weight': min_weight, 'max_weight': max_weight}
+    path = filename + '.csr-' + cache_key(load_csr, params, random_state)[:16]
+    if cache and os.path.exists(os.path.join(path, 'graph.json')):
+        return CompiledGraph.load(path), None
+
+    chunks = list(read_edges(filename))
+    src = np.concatenate([c[0] for c in chunks]) if chunks else np.empty(0, dtype=np.int64)
+    dst = np.concatenate([c[1] for c in chunks]) if chunks else np.empty(0, dtype=np.int64)
+    del chunks
+
+    # contiguous int32 indices in the order of the node ids
+    ids = np.concatenate([src, dst])
+    order = argsort(ids)
+    ids = ids[order]
+    first = np.ones(ids.size, dtype=bool)
+    first[1:] = ids[1:] != ids[:-1]
+    nodes = ids[first]
+    n = len(nodes)
+    index = np.empty(ids.size, dtype=np.int32)
+    index[order] = np.cumsum(first) - 1
+    src, dst = index[:len(src)], index[len(src):]
+    del ids, order, index
+
+    if not directed:
+        src, dst = np.minimum(src, dst), np.maximum(src, dst)
+    key = engine.unique(np.multiply(src, n, dtype=np.int64) + dst)
+    src, dst = key // n, key % n
+
+    rng = engine.check_random_state(random_state)
+    weights = np.round(rng.uniform(min_weight, max_weight, size=len(key)), 2)
+    cg = CompiledGraph.from_edges(nodes.tolist(), src, dst, weights, directed)
+
+    if cache:
+        # saved under a temporary name first, so a partial cache is never read
+        tmp = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(path)))
+        cg.save(tmp)
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return cg, None
+
+def soc_epinions1(format='networkx'):
     url = "https://snap.stanford.edu/data/soc-Epinions1.txt.gz"
-    filename = "snap_datasets/soc-Epinions1.txt.gz"
+    filename = os.path.join(download.data_dir('snap'), "soc-Epinions1.txt.gz")
     check_and_download(url, filename)
+    if format == 'csr':
+        return load_csr(filename)
     return load_graph(filename)
 
-def soc_livejournal1():
+def soc_livejournal1(format='networkx'):
     url = "https://snap.stanford.edu/data/soc-LiveJournal1.txt.gz"
-    filename = "snap_datasets/soc-LiveJournal1.txt.gz"
+    filename = os.path.join(download.data_dir('snap'), "soc-LiveJournal1.txt.gz")
     check_and_download(url, filename)
+    if format == 'csr':
+        return load_csr(filename)
     return load_graph(filename)
 
-def wiki_vote():
+def wiki_vote(format='networkx'):
     url = "https://snap.stanford.edu/data/wiki-Vote.txt.gz"
-    filename = "snap_datasets/wiki-Vote.txt.gz"
+    filename = os.path.join(download.data_dir('snap'), "wiki-Vote.txt.gz")
     check_and_download(url, filename)
+    if format == 'csr':
+        return load_csr(filename)
     return load_graph(filename)
 
-def email_euall():
+def email_euall(format='networkx'):
     url = "https://snap.stanford.edu/data/email-EuAll.txt.gz"
-    filename = "snap_datasets/email-EuAll.txt.gz"
+    filename = os.path.join(download.data_dir('snap'), "email-EuAll.txt.gz")
     check_and_download(url, filename)
+    if format == 'csr':
+        return load_csr(filename)
     return load_graph(filename)
 
-def email_enron():
+def email_enron(format='networkx'):
     url = "https://snap.stanford.edu/data/email-Enron.txt.gz"
-    filename = "snap_datasets/email-Enron.txt.gz"
+    filename = os.path.join(download.data_dir('snap'), "email-Enron.txt.gz")
     check_and_download(url, filename)
+    if format == 'csr':
+        return load_csr(filename)
     return load_graph(filename)
 
-def wiki_talk():
+def wiki_talk(format='networkx'):
     url = "https://snap.stanford.edu/data/wiki-Talk.txt.gz"
-    filename = "snap_datasets/wiki-Talk.txt.gz"
+    filename = os.path.join(download.data_dir('snap'), "wiki-Talk.txt.gz")
     check_and_download(url, filename)
+    if format == 'csr':
+        return load_csr(filename)
     return load_graph(filename)
 
-def cit_hepph():
+def cit_hepph(format='networkx'):
     url = "https://snap.stanford.edu/data/cit-HepPh.txt.gz"
-    filename = "snap_datasets/cit-HepPh.txt.gz"
+    filename = os.path.join(download.data_dir('snap'), "cit-HepPh.txt.gz")
     check_and_download(url, filename)
+    if format == 'csr':
+        return load_csr(filename)
     return load_graph(filename)
 
-def cit_hepth():
+def cit_hepth(format='networkx'):
     url = "https://snap.stanford.edu/data/cit-HepTh.txt.gz"
-    filename = "snap_datasets/cit-HepTh.txt.gz"
+    filename = os.path.join(download.data_dir('snap'), "cit-HepTh.txt.gz")
     check_and_download(url, filename)
+    if format == 'csr':
+        return load_csr(filename)
     return load_graph(filename)
 
-def cit_patents():
+def cit_patents(format='networkx'):
     url = "https://snap.stanford.edu/data/cit-Patents.txt.gz"
-    filename = "snap_datasets/cit-Patents.txt.gz"
+    filename = os.path.join(download.data_dir('snap'), "cit-Patents.txt.gz")
     check_and_download(url, filename)
+    if format == 'csr':
+        return load_csr(filename)
     return load_graph(filename)
 
 def preprocess_stackoverflow(filename):
-    with gzip.open(filename, 'rt') as f:
-        lines = f.readlines()
-    
-    with open("snap_datasets/stackoverflow_preprocessed.txt", 'w') as f:
+    with gzip.open(filename, 'rt') as lines, open(os.path.join(download.data_dir('snap'), "stackoverflow_preprocessed.txt"), 'w') as f:
         for line in lines:
             parts = line.split()
             if len(parts) == 3:
@@ -110,18 +188,17 @@ def preprocess_stackoverflow(filename):
             else:
                 f.write(line)
 
-def sx_stackoverflow():
+def sx_stackoverflow(format='networkx'):
     url = "https://snap.stanford.edu/data/sx-stackoverflow.txt.gz"
-    filename = "snap_datasets/sx-stackoverflow.txt.gz"
+    filename = os.path.join(download.data_dir('snap'), "sx-stackoverflow.txt.gz")
     check_and_download(url, filename)
+    if format == 'csr':
+        return load_csr(filename)
     preprocess_stackoverflow(filename)
-    return load_graph("snap_datasets/stackoverflow_preprocessed.txt")
+    return load_graph(os.path.join(download.data_dir('snap'), "stackoverflow_preprocessed.txt"))
 
 def preprocess_temporal(filename, output_filename):
-    with gzip.open(filename, 'rt') as f:
-        lines = f.readlines()
-    
-    with open(output_filename, 'w') as f:
+    with gzip.open(filename, 'rt') as lines, open(output_filename, 'w') as f:
         for line in lines:
             parts = line.split()
             if len(parts) >= 2:
@@ -130,47 +207,59 @@ def preprocess_temporal(filename, output_filename):
             else:
                 f.write(line)
 
-def sx_mathoverflow():
+def sx_mathoverflow(format='networkx'):
     url = "https://snap.stanford.edu/data/sx-mathoverflow.txt.gz"
-    filename = "snap_datasets/sx-mathoverflow.txt.gz"
+    filename = os.path.join(download.data_dir('snap'), "sx-mathoverflow.txt.gz")
     check_and_download(url, filename)
-    preprocess_temporal(filename, "snap_datasets/mathoverflow_preprocessed.txt")
-    return load_graph("snap_datasets/mathoverflow_preprocessed.txt")
+    if format == 'csr':
+        return load_csr(filename)
+    preprocess_temporal(filename, os.path.join(download.data_dir('snap'), "mathoverflow_preprocessed.txt"))
+    return load_graph(os.path.join(download.data_dir('snap'), "mathoverflow_preprocessed.txt"))
 
-def sx_superuser():
+def sx_superuser(format='networkx'):
     url = "https://snap.stanford.edu/data/sx-superuser.txt.gz"
-    filename = "snap_datasets/sx-superuser.txt.gz"
+    filename = os.path.join(download.data_dir('snap'), "sx-superuser.txt.gz")
     check_and_download(url, filename)
-    preprocess_temporal(filename, "snap_datasets/superuser_preprocessed.txt")
-    return load_graph("snap_datasets/superuser_preprocessed.txt")
+    if format == 'csr':
+        return load_csr(filename)
+    preprocess_temporal(filename, os.path.join(download.data_dir('snap'), "superuser_preprocessed.txt"))
+    return load_graph(os.path.join(download.data_dir('snap'), "superuser_preprocessed.txt"))
 
-def sx_askubuntu():
+def sx_askubuntu(format='networkx'):
     url = "https://snap.stanford.edu/data/sx-askubuntu.txt.gz"
-    filename = "snap_datasets/sx-askubuntu.txt.gz"
+    filename = os.path.join(download.data_dir('snap'), "sx-askubuntu.txt.gz")
     check_and_download(url, filename)
-    preprocess_temporal(filename, "snap_datasets/askubuntu_preprocessed.txt")
-    return load_graph("snap_datasets/askubuntu_preprocessed.txt")
+    if format == 'csr':
+        return load_csr(filename)
+    preprocess_temporal(filename, os.path.join(download.data_dir('snap'), "askubuntu_preprocessed.txt"))
+    return load_graph(os.path.join(download.data_dir('snap'), "askubuntu_preprocessed.txt"))
 
-def wiki_talk_temporal():
+def wiki_talk_temporal(format='networkx'):
     url = "https://snap.stanford.edu/data/wiki-talk-temporal.txt.gz"
-    filename = "snap_datasets/wiki-talk-temporal.txt.gz"
+    filename = os.path.join(download.data_dir('snap'), "wiki-talk-temporal.txt.gz")
     check_and_download(url, filename)
-    preprocess_temporal(filename, "snap_datasets/wiki_talk_temporal_preprocessed.txt")
-    return load_graph("snap_datasets/wiki_talk_temporal_preprocessed.txt")
+    if format == 'csr':
+        return load_csr(filename)
+    preprocess_temporal(filename, os.path.join(download.data_dir('snap'), "wiki_talk_temporal_preprocessed.txt"))
+    return load_graph(os.path.join(download.data_dir('snap'), "wiki_talk_temporal_preprocessed.txt"))
 
-def email_eu_core_temporal():
+def email_eu_core_temporal(format='networkx'):
     url = "https://snap.stanford.edu/data/email-Eu-core-temporal.txt.gz"
-    filename = "snap_datasets/email-Eu-core-temporal.txt.gz"
+    filename = os.path.join(download.data_dir('snap'), "email-Eu-core-temporal.txt.gz")
     check_and_download(url, filename)
-    preprocess_temporal(filename, "snap_datasets/email_eu_core_temporal_preprocessed.txt")
-    return load_graph("snap_datasets/email_eu_core_temporal_preprocessed.txt")
+    if format == 'csr':
+        return load_csr(filename)
+    preprocess_temporal(filename, os.path.join(download.data_dir('snap'), "email_eu_core_temporal_preprocessed.txt"))
+    return load_graph(os.path.join(download.data_dir('snap'), "email_eu_core_temporal_preprocessed.txt"))
 
-def college_msg():
+def college_msg(format='networkx'):
     url = "https://snap.stanford.edu/data/CollegeMsg.txt.gz"
-    filename = "snap_datasets/CollegeMsg.txt.gz"
+    filename = os.path.join(download.data_dir('snap'), "CollegeMsg.txt.gz")
     check_and_download(url, filename)
-    preprocess_temporal(filename, "snap_datasets/CollegeMsg_preprocessed.txt")
-    return load_graph("snap_datasets/CollegeMsg_preprocessed.txt")
+    if format == 'csr':
+        return load_csr(filename)
+    preprocess_temporal(filename, os.path.join(download.data_dir('snap'), "CollegeMsg_preprocessed.txt"))
+    return load_graph(os.path.join(download.data_dir('snap'), "CollegeMsg_preprocessed.txt"))
 
 # def main():
 
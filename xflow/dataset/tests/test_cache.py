@@ -0,0 +1,32 @@
+import random
+import numpy as np
+
+from xflow.compiled import compile_graph
+from xflow.dataset import cache
+from xflow.dataset.nx import connSW
+
+
+def test_cached_graph(tmp_path):
+    calls = []
+
+    def loader(n):
+        calls.append(n)
+        return connSW(n)
+
+    cg, config = cache.load(loader, seed=3, path=str(tmp_path), n=50)
+    again, _ = cache.load(loader, seed=3, path=str(tmp_path), n=50)
+    assert config is None and calls == [50]
+    assert isinstance(again.indices, np.memmap)
+
+    random.seed(3)
+    np.random.seed(3)
+    expected = compile_graph(*connSW(50))
+    for name in ('indptr', 'indices', 'weights', 'rindptr', 'rindices', 'rweights'):
+        assert np.array_equal(getattr(again, name), getattr(expected, name))
+    assert again.nodelist == expected.nodelist
+
+    # other parameters or seeds are other graphs
+    cache.load(loader, seed=4, path=str(tmp_path), n=50)
+    cache.load(loader, seed=3, path=str(tmp_path), n=60)
+    assert calls == [50, 50, 60]
+    assert cache.cached(connSW, path=str(tmp_path), n=50).__name__ == 'connSW'
@@ -0,0 +1,130 @@
+import os
+import gzip
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from xflow.dataset import download
+
+DATA = os.urandom(300000)
+SHA = hashlib.sha256(DATA).hexdigest()
+GZ = gzip.compress(DATA)
+
+
+class Handler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        Handler.requests.append((self.path, self.headers.get('Range')))
+        # .gz files are gzipped unless they are called broken
+        data = GZ if self.path.endswith('.gz') and 'broken' not in self.path else DATA
+        start = 0
+        if self.headers.get('Range'):
+            start = int(self.headers['Range'].split('=')[1].rstrip('-'))
+            if start >= len(data):
+                self.send_response(416)
+                self.end_headers()
+                return
+            self.send_response(206)
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(data) - start))
+        self.end_headers()
+        self.wfile.write(data[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    Handler.requests = []
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_and_verify(tmp_path, url):
+    path = str(tmp_path / 'data.bin')
+    assert download.download(url + '/data.bin', path) == path
+    with open(path, 'rb') as f:
+        assert f.read() == DATA
+    with open(path + '.sha256') as f:
+        assert f.read().split()[0] == SHA
+
+    # a verified copy is not fetched again, a corrupted one is
+    download.download(url + '/data.bin', path)
+    assert len(Handler.requests) == 1
+    with open(path, 'r+b') as f:
+        f.truncate(1000)
+    download.download(url + '/data.bin', path)
+    assert len(Handler.requests) == 2
+    assert download.sha256sum(path) == SHA
+
+
+def test_resume(tmp_path, url):
+    path = str(tmp_path / 'data.bin')
+    with open(path + '.part', 'wb') as f:
+        f.write(DATA[:123456])
+    download.download(url + '/data.bin', path, sha256=SHA)
+    assert Handler.requests == [('/data.bin', 'bytes=123456-')]
+    assert not os.path.exists(path + '.part')
+    with open(path, 'rb') as f:
+        assert f.read() == DATA
+
+    # a complete partial file is answered with 416
+    os.rename(path, path + '.part')
+    os.remove(path + '.sha256')
+    download.download(url + '/data.bin', path, sha256=SHA)
+    assert download.sha256sum(path) == SHA
+
+
+def test_mismatch(tmp_path, url):
+    path = str(tmp_path / 'data.bin')
+    with pytest.raises(ValueError):
+        download.download(url + '/data.bin', path, sha256='0' * 64)
+    assert os.listdir(tmp_path) == []
+
+
+def test_download_many(tmp_path, url):
+    files = [(url + f'/{i}.bin', str(tmp_path / f'{i}.bin'), SHA) for i in range(8)]
+    assert download.download_many(files, workers=4) == [path for _, path, _ in files]
+    assert sorted(path for path, _ in Handler.requests) == sorted(f'/{i}.bin' for i in range(8))
+    assert all(download.sha256sum(path) == SHA for _, path, _ in files)
+
+
+def test_verified_copy_is_not_hashed_again(tmp_path, url, monkeypatch):
+    path = str(tmp_path / 'data.bin')
+    download.download(url + '/data.bin', path, sha256=SHA)
+    hashed = []
+    monkeypatch.setattr(download, 'sha256sum', lambda filename: hashed.append(filename) or SHA)
+    download.download(url + '/data.bin', path, sha256=SHA)
+    assert hashed == [] and len(Handler.requests) == 1
+
+    # a changed file is hashed again
+    os.utime(path, ns=(0, 0))
+    download.download(url + '/data.bin', path, sha256=SHA)
+    assert hashed == [path] and len(Handler.requests) == 1
+
+
+def test_compressed_without_digest(tmp_path, url):
+    path = str(tmp_path / 'data.gz')
+    download.download(url + '/data.gz', path)
+    with gzip.open(path) as f:
+        assert f.read() == DATA
+
+    # without a digest a file that does not decompress is not trusted
+    path = str(tmp_path / 'broken.gz')
+    with pytest.raises(ValueError):
+        download.download(url + '/broken.gz', path)
+    assert not os.path.exists(path) and not os.path.exists(path + '.part')
+    with open(path, 'wb') as f:
+        f.write(GZ[:1000])
+    download.download(url + '/data.gz', path)
+    with gzip.open(path) as f:
+        assert f.read() == DATA
@@ -0,0 +1,74 @@
+import os
+import gzip
+from io import BytesIO, StringIO
+from zipfile import ZipFile
+import numpy as np
+import pandas as pd
+
+from xflow.dataset import faf, eurostat
+
+FAF_CSV = """fr_orig,dms_orig,dms_dest,fr_dest,sctg2,dms_mode,tons_2017,tons_2018
+,11,12,,1,1,1.5,9
+,11,12,,2,1,2.0,9
+,12,11,,1,3,4.0,9
+,19,19,,1,1,0.25,9
+,11,12,,1,2,0.5,9
+"""
+
+EUROSTAT_TSV = """freq,tra_type,nst07,unit,geo\\TIME_PERIOD\t2019 \t2020 
+A,TOTAL,TOTAL,THS_T,AT\t100 \t: 
+A,TOTAL,TOTAL,MIO_TKM,AT\t5 \t6 p
+A,TOTAL,TOTAL,THS_T,BE\t: \t7.5 e
+"""
+
+
+def test_faf_flows():
+    table = faf.read_flows(StringIO(FAF_CSV))
+    assert table[['dms_orig', 'dms_dest']].values.tolist() == [[11, 12], [12, 11], [19, 19]]
+    assert table['weight'].tolist() == [4.0, 4.0, 0.25]
+    assert faf.read_flows(StringIO(FAF_CSV), year=2018)['weight'].tolist() == [27, 9, 9]
+
+    g = faf.to_graph(table)
+    assert list(g.nodes()) == [11, 12, 19]
+    assert g[11][12]['weight'] == 4.0 and g.has_edge(19, 19)
+
+    cg = faf.to_graph(table, format='csr')
+    assert cg.nodelist == [11, 12, 19] and cg.number_of_edges() == 3
+    assert np.array_equal(cg.to_scipy().toarray(), [[0, 4.0, 0], [4.0, 0, 0], [0, 0, 0.25]])
+
+
+def test_eurostat_flows():
+    table = eurostat.read_flows(StringIO(EUROSTAT_TSV))
+    assert table.values.tolist() == [['AT', '2019', 5.0], ['AT', '2020', 6.0], ['BE', '2020', 7.5]]
+
+    g = eurostat.to_graph(table)
+    assert sorted(g.edges(data='weight')) == [('AT', '2019', 5.0), ('AT', '2020', 6.0), ('BE', '2020', 7.5)]
+    cg = eurostat.to_graph(table, format='csr')
+    assert cg.nodelist == ['AT', 'BE', '2019', '2020'] and cg.number_of_edges() == 3
+
+
+class Response:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+def test_flows_without_parquet(tmp_path, monkeypatch):
+    def no_engine(*args, **kwargs):
+        raise ImportError("Unable to find a usable engine")
+    monkeypatch.setattr(pd.DataFrame, 'to_parquet', no_engine)
+    monkeypatch.setattr(pd, 'read_parquet', no_engine)
+
+    archive = BytesIO()
+    with ZipFile(archive, 'w') as zip_file:
+        zip_file.writestr("FAF5.6.csv", FAF_CSV)
+    monkeypatch.setattr(faf.requests, 'get', lambda url: Response(archive.getvalue()))
+    for _ in range(2):
+        table = faf.flows(path=str(tmp_path))
+        assert table['weight'].tolist() == [4.0, 4.0, 0.25]
+
+    monkeypatch.setattr(eurostat.requests, 'get', lambda url: Response(gzip.compress(EUROSTAT_TSV.encode())))
+    assert len(eurostat.flows(path=str(tmp_path))) == 3
+    assert not [f for _, _, files in os.walk(tmp_path) for f in files]
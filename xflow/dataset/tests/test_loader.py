@@ -0,0 +1,43 @@
+import pickle
+import random
+import numpy as np
+import pytest
+
+from xflow.compiled import compile_graph
+from xflow.dataset import load_graph
+from xflow.diffusion import engine
+
+
+def test_load_graph(tmp_path):
+    cg, config = load_graph('connSW', seed=1, path=str(tmp_path), n=200)
+    assert config is None and isinstance(cg.indices, np.memmap)
+    assert cg.indptr.dtype == np.int32 and cg.weights.dtype == np.float32
+    assert cg.meta['loader'] == 'connSW' and cg.meta['params'] == {'n': 200} and cg.meta['nodes'] == 200
+
+    random.seed(1)
+    np.random.seed(1)
+    expected = compile_graph(*load_graph('connSW', backend='networkx', n=200))
+    assert np.array_equal(cg.indptr, expected.indptr) and np.array_equal(cg.indices, expected.indices)
+    assert np.allclose(cg.weights, expected.weights)
+    assert np.array_equal(engine.simulate(cg, [0, 1], 'IC', rounds=50, random_state=0),
+                          engine.simulate(expected, [0, 1], 'IC', rounds=50, random_state=0))
+
+    # workers get the path and map the same files
+    data = pickle.dumps(cg)
+    assert len(data) < 1000
+    again = pickle.loads(data)
+    assert isinstance(again.weights, np.memmap) and again.nodelist == cg.nodelist
+    assert len(pickle.dumps(expected)) > len(data)
+
+
+def test_load_graph_csr_loader(tmp_path):
+    cg, _ = load_graph('karate_club', path=str(tmp_path))
+    assert cg.meta['params'] == {'format': 'csr'}
+    assert cg.n == 34 and cg.number_of_edges() == 78
+
+
+def test_unknown():
+    with pytest.raises(ValueError):
+        load_graph('nope')
+    with pytest.raises(ValueError):
+        load_graph('BA', backend='dense')
@@ -0,0 +1,35 @@
+import networkx as nx
+import numpy as np
+
+from xflow.dataset import pyg
+
+
+def _edge_set(cg):
+    return {(cg.nodelist[u], cg.nodelist[v]) for u in range(cg.n) for v in cg.indices[cg.indptr[u]:cg.indptr[u + 1]]}
+
+
+def test_edge_index_to_csr():
+    rng = np.random.default_rng(0)
+    src, dst = rng.integers(0, 60, size=(2, 150)) * 3 + 7
+    src, dst = np.append(src, [1000, 1001]), np.append(dst, [1001, 1000])
+
+    G = nx.from_edgelist(zip(src.tolist(), dst.tolist()))
+    g = G.subgraph(max(nx.connected_components(G), key=len))
+    cg = pyg.edge_index_to_csr(src, dst, weights=pyg._percent(40, 80), relabel=False, largest_component=True)
+    assert cg.nodelist == list(g.nodes())
+    assert _edge_set(cg) == set(g.edges()) | {(v, u) for u, v in g.edges()}
+    assert set(np.unique(cg.weights * 100).round()) <= set(range(40, 80))
+
+    # relabelled in order of first appearance like convert_node_labels_to_integers
+    D = nx.convert_node_labels_to_integers(nx.DiGraph(zip(src.tolist(), dst.tolist())))
+    cg = pyg.edge_index_to_csr(src, dst, directed=True)
+    assert cg.nodelist == list(D.nodes()) and _edge_set(cg) == set(D.edges())
+    assert cg.weights.min() >= 0.1 and cg.weights.max() <= 0.5
+
+
+def test_karate_club():
+    g, _ = pyg.karate_club()
+    cg, config = pyg.karate_club(format='csr')
+    assert config is None and cg.nodelist == list(g.nodes())
+    assert cg.number_of_edges() == g.number_of_edges()
+    assert _edge_set(cg) == set(g.edges()) | {(v, u) for u, v in g.edges()}
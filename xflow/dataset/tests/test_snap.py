@@ -0,0 +1,57 @@
+import gzip
+import networkx as nx
+import numpy as np
+
+from xflow.compiled import CompiledGraph
+from xflow.dataset import snap
+
+
+def write_edges(path, lines):
+    with gzip.open(path, 'wt') as f:
+        f.write('# Directed graph\n# FromNodeId\tToNodeId\n')
+        f.write(''.join(lines))
+
+
+def test_load_csr_matches_read_edgelist(tmp_path):
+    rng = np.random.default_rng(0)
+    edges = rng.integers(0, 300, size=(2000, 2)) * 7 + 11
+    filename = str(tmp_path / 'edges.txt.gz')
+    write_edges(filename, [f'{a}\t{b}\n' for a, b in edges])
+
+    cg, config = snap.load_csr(filename, random_state=0)
+    g = nx.relabel_nodes(nx.read_edgelist(filename), int)
+    assert config is None and cg.indices.dtype == np.int32
+    assert sorted(cg.nodelist) == sorted(g.nodes()) and cg.number_of_edges() == g.number_of_edges()
+    src = np.repeat(np.arange(cg.n), np.diff(cg.indptr))
+    assert {(cg.nodelist[a], cg.nodelist[b]) for a, b in zip(src, cg.indices)} == \
+        set(g.edges()) | {(b, a) for a, b in g.edges()}
+    assert cg.weights.min() >= 0.1 and cg.weights.max() <= 0.5
+    assert np.allclose(cg.weights, np.round(cg.weights, 2))
+
+    # the second load maps the cached arrays, with the same weights
+    again, _ = snap.load_csr(filename, random_state=0)
+    assert isinstance(again.indices, np.memmap) and np.array_equal(again.weights, cg.weights)
+
+
+def test_load_csr_cache_parameters(tmp_path):
+    filename = str(tmp_path / 'edges.txt.gz')
+    write_edges(filename, ['1 2\n', '2 3\n', '3 1\n', '3 4\n'])
+    cg, _ = snap.load_csr(filename, random_state=0)
+
+    # other weights, seeds or direction are other graphs, not the cached one
+    heavy, _ = snap.load_csr(filename, min_weight=0.8, max_weight=0.9, random_state=0)
+    assert heavy.weights.min() >= 0.8 and cg.weights.max() <= 0.5
+    other, _ = snap.load_csr(filename, random_state=1)
+    assert not np.array_equal(other.weights, cg.weights)
+    directed, _ = snap.load_csr(filename, directed=True, random_state=0)
+    assert directed.directed and directed.number_of_edges() == 4 and not cg.directed
+    assert isinstance(snap.load_csr(filename, min_weight=0.8, max_weight=0.9, random_state=0)[0].weights, np.memmap)
+
+
+def test_read_edges_temporal(tmp_path):
+    filename = str(tmp_path / 'temporal.txt.gz')
+    write_edges(filename, ['1 2 1000\n', '2 3 1001\n', '1 2 1002\n'])
+    src, dst = np.concatenate(list(snap.read_edges(filename, chunksize=2)), axis=1)
+    assert src.tolist() == [1, 2, 1] and dst.tolist() == [2, 3, 2]
+    cg, _ = snap.load_csr(filename, directed=True, cache=False)
+    assert cg.number_of_edges() == 2 and cg.directed
@@ -1,34 +1,11 @@
-import torch_geometric.datasets as ds
-import random
-import ndlib.models.epidemics as ep
-import ndlib.models.ModelConfig as mc
+from xflow.compiled import compile_graph
+from xflow.diffusion.engine import simulate, node_mask
 
 
-def LT(g, config, seed, rounds=100):
-    result = []
+def LT(g, config, seed, rounds=100, steps=4, random_state=None, blocked_nodes=None):
+    # node thresholds are redrawn from {0.01, ..., 0.19} for every round
+    cg = compile_graph(g, config)
+    result = simulate(cg, seed, model='LT', rounds=rounds, steps=steps, random_state=random_state,
+                      blocked=node_mask(cg, blocked_nodes))
 
-    for iter in range(rounds):
-
-        model_temp = ep.ThresholdModel(g) # _temp
-        config_temp = mc.Configuration()
-        config_temp.add_model_initial_configuration('Infected', seed)
-
-        for a, b in g.edges(): # _temp
-            weight = config.config["edges"]['threshold'][(a, b)]
-            # g_temp[a][b]['weight'] = weight
-            config_temp.add_edge_configuration('threshold', (a, b), weight)
-
-        for i in g.nodes():
-            threshold = random.randrange(1, 20)
-            threshold = round(threshold / 100, 2)
-            config_temp.add_node_configuration("threshold", i, threshold)
-
-        model_temp.set_initial_status(config_temp)
-
-        iterations = model_temp.iteration_bunch(5)
-
-        total_no = iterations[4]['node_count'][1]
-
-        result.append(total_no)
-
-    return result
+    return result.tolist()
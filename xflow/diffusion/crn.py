@@ -0,0 +1,191 @@
+import numpy as np
+
+from xflow.diffusion import engine
+
+# Common random numbers (CRN) for comparing seed sets.
+#
+# Instead of drawing fresh coins for every estimate, rounds "worlds" are
+# sampled once and every seed set is evaluated on the same worlds:
+#   IC  live-edge worlds, one bit per arc and world (np.packbits)
+#   SI  a geometric(beta) infection delay per arc and world
+#   LT  the node thresholds of ndlib's ThresholdModel per world
+# For IC and SI a cascade on a world is a shortest path search (hops, or
+# total delay) cut at steps, so the spread of S + v only needs a search from
+# v that stops at nodes S already reaches as early. The distances of the
+# current seed sets are cached as (n, rounds) uint8 depth matrices.
+
+# depth of unreached (node, world) pairs
+UNREACHED = 255
+
+
+class Worlds:
+    """
+    rounds sampled worlds of model on a CompiledGraph. Has the interface of
+    engine.SpreadCache: calling it gives the mean spread of a seed set and
+    gain(seed, node) its marginal gain, both on the same worlds.
+    """
+
+    def __init__(self, cg, model='IC', rounds=100, steps=4, beta=0.1, random_state=None):
+        if model not in ('IC', 'LT', 'SI'):
+            raise ValueError(f"Unknown diffusion model {model}")
+        if steps >= UNREACHED:
+            raise ValueError(f"steps must be below {UNREACHED}")
+        rng = engine.check_random_state(random_state)
+        self.cg = cg
+        self.model, self.rounds, self.steps, self.beta = model, rounds, steps, beta
+
+        arcs = len(cg.indices)
+        batch = max(1, engine.MAX_ARCS // max(arcs, 1))
+        if model == 'IC':
+            self.live = np.concatenate([
+                np.packbits(rng.random((min(batch, rounds - start), arcs)) < cg.weights, axis=1)
+                for start in range(0, rounds, batch)]) if rounds else np.zeros((0, 0), dtype=np.uint8)
+        elif model == 'SI':
+            # delays past steps never infect within the horizon
+            self.delay = np.concatenate([
+                np.minimum(rng.geometric(beta, (min(batch, rounds - start), arcs)), steps + 1).astype(np.uint8)
+                for start in range(0, rounds, batch)]) if rounds else np.zeros((0, 0), dtype=np.uint8)
+        else:
+            self.theta = rng.integers(1, 20, size=(cg.n, rounds), dtype=np.int8)
+
+        self.states = {}
+        self.cache = {}
+
+    def _length(self, edge, world):
+        # arc lengths in the given worlds, UNREACHED for dead IC arcs
+        if self.model == 'IC':
+            bit = (self.live[world, edge >> 3] >> (7 - (edge & 7)).astype(np.uint8)) & 1
+            return np.where(bit == 1, 1, UNREACHED)
+        return self.delay[world, edge].astype(np.int64)
+
+    def _search(self, depth, node, col, world):
+        # lower depth in place to the distances from the (node, col) pairs,
+        # expanding only pairs the search reaches earlier than depth says
+        cg, C = self.cg, depth.shape[1]
+        flat = depth.reshape(-1)
+        key = np.multiply(node, C, dtype=np.int64) + col
+        key = engine.unique(key[flat[key] > 0])
+        flat[key] = 0
+        buckets = {0: [key]}
+
+        for t in range(self.steps):
+            if t not in buckets:
+                continue
+            key = engine.unique(np.concatenate(buckets.pop(t)))
+            key = key[flat[key] == t]
+            node, col = key // C, key % C
+
+            edge, owner = engine.expand(cg.indptr, node)
+            col = col[owner]
+            arrival = t + self._length(edge, world[col])
+            ok = arrival <= self.steps
+            key = np.multiply(cg.indices[edge[ok]], C, dtype=np.int64) + col[ok]
+            arrival = arrival[ok]
+            better = arrival < flat[key]
+            key, arrival = key[better], arrival[better]
+
+            # earliest arrival per pair
+            order = np.lexsort((arrival, key))
+            key, arrival = key[order], arrival[order]
+            first = np.ones(key.size, dtype=bool)
+            first[1:] = key[1:] != key[:-1]
+            key, arrival = key[first], arrival[first]
+            flat[key] = arrival
+
+            for a in np.unique(arrival):
+                buckets.setdefault(int(a), []).append(key[arrival == a])
+
+    def _blocked_depth(self, columns, blocked, extra):
+        # blocked pairs get depth 0, so they count as reached and never expand
+        depth = np.full((self.cg.n, columns), UNREACHED, dtype=np.uint8)
+        if blocked is not None:
+            depth[blocked, :] = 0
+        if extra is not None:
+            depth[extra, np.arange(columns)] = 0
+        return depth
+
+    def _state(self, seed):
+        # depth matrix of seed, the two most recent sets are kept
+        seeds = engine.seed_index(self.cg, seed)
+        k = seeds.tobytes()
+        if k not in self.states:
+            depth = self._blocked_depth(self.rounds, None, None)
+            world = np.arange(self.rounds)
+            node, col = engine._frontier(seeds, self.rounds)
+            self._search(depth, node, col, world)
+            self.states[k] = depth
+            while len(self.states) > 2:
+                self.states.pop(next(iter(self.states)))
+        return self.states[k]
+
+    def counts(self, seed):
+        """Number of infected nodes of seed in every world."""
+        if self.model == 'LT':
+            seeds = engine.seed_index(self.cg, seed)
+            return engine._cascade_lt(self.cg, seeds, self.rounds, self.steps, None, theta=self.theta)
+        return (self._state(seed) <= self.steps).sum(axis=0)
+
+    def __call__(self, seed):
+        k = engine.seed_index(self.cg, seed).tobytes()
+        if k not in self.cache:
+            self.cache[k] = self.counts(seed).mean()
+        return self.cache[k]
+
+    def gain(self, seed, node):
+        """Marginal gain of adding node to seed."""
+        return self.gains(seed, engine.seed_index(self.cg, [node]))[0] if node in self.cg.index else 0.0
+
+    def gains(self, seed, candidates):
+        """
+        Marginal gains of adding each candidate node index to seed, evaluated
+        in batches of candidates. For IC and SI every candidate searches a copy
+        of the depth matrix of seed and only expands pairs it reaches first.
+        """
+        candidates = np.asarray(candidates, dtype=np.int64)
+        covered = self.counts(seed)
+        total = np.zeros(len(candidates))
+        for start, size in self._chunks(candidates.size):
+            world = np.tile(np.arange(self.rounds), size // self.rounds)
+            node = np.repeat(candidates[start:start + size // self.rounds], self.rounds)
+            if self.model == 'LT':
+                seeds = engine.seed_index(self.cg, seed)
+                counts = engine._cascade_lt(self.cg, seeds, size, self.steps, None,
+                                            theta=self.theta[:, world], extra_seed=node)
+            else:
+                depth = np.tile(self._state(seed), size // self.rounds)
+                self._search(depth, node, np.arange(size), world)
+                counts = (depth <= self.steps).sum(axis=0)
+            gain = counts - covered[world]
+            total[start:start + size // self.rounds] = gain.reshape(-1, self.rounds).sum(axis=1)
+        return total / self.rounds
+
+    def blocking_spreads(self, seed, candidates, blocked=None):
+        """
+        Mean spread of seed when each candidate node index is blocked in
+        addition to the blocked mask, like engine.blocking_spreads.
+        """
+        seeds = engine.seed_index(self.cg, seed)
+        candidates = np.asarray(candidates, dtype=np.int64)
+        total = np.zeros(len(candidates))
+        for start, size in self._chunks(candidates.size):
+            extra = np.repeat(candidates[start:start + size // self.rounds], self.rounds)
+            world = np.tile(np.arange(self.rounds), size // self.rounds)
+            if self.model == 'LT':
+                counts = engine._cascade_lt(self.cg, seeds, size, self.steps, None, blocked, extra,
+                                            theta=self.theta[:, world])
+            else:
+                depth = self._blocked_depth(size, blocked, extra)
+                hidden = (depth == 0).sum(axis=0)
+                node, col = engine._frontier(seeds, size)
+                self._search(depth, node, col, world)
+                counts = (depth <= self.steps).sum(axis=0) - hidden
+            total[start:start + size // self.rounds] = counts.reshape(-1, self.rounds).sum(axis=1)
+        return total / self.rounds
+
+    def _chunks(self, count):
+        # (first candidate, columns) batches of whole candidates
+        per = min(count, engine.MAX_CELLS // max(self.cg.n * self.rounds, 1),
+                  engine.MAX_ARCS // max(len(self.cg.indices) * self.rounds, 1))
+        per = max(1, per)
+        for start in range(0, count, per):
+            yield start, min(per, count - start) * self.rounds
@@ -0,0 +1,357 @@
+import os
+import numpy as np
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+
+# Vectorized Monte Carlo engine behind IC, LT and SI.
+#
+# The graph is compiled once into a CompiledGraph and all rounds are simulated
+# together: the state of every (node, round) pair lives in a node-by-round
+# matrix and only the pairs on the current frontier are expanded each step.
+
+# upper bound on node-by-round cells held in memory at once
+MAX_CELLS = 1 << 26
+# upper bound on edge-by-round pairs a single step may expand at once
+MAX_ARCS = 1 << 24
+
+
+def check_random_state(random_state=None):
+    """
+    Turn random_state into a np.random.Generator.
+    None derives a generator from the global np.random state, so seeding
+    numpy keeps the simulations reproducible.
+    """
+    if isinstance(random_state, np.random.Generator):
+        return random_state
+    if random_state is None:
+        random_state = np.random.randint(0, 2**31 - 1, size=4)
+    return np.random.default_rng(random_state)
+
+
+def entropy(random_state=None):
+    """Integer entropy for np.random.SeedSequence, drawn like check_random_state."""
+    if isinstance(random_state, (int, np.integer)):
+        return int(random_state)
+    return int(check_random_state(random_state).integers(2**63))
+
+
+def stream(cg, key, seed):
+    """Random stream of a seed set: the same set always gets the same draws."""
+    return np.random.SeedSequence(key, spawn_key=tuple(seed_index(cg, seed).tolist()))
+
+
+def seed_index(cg, seed):
+    """Map seed nodes onto unique node indices, ignoring unknown nodes."""
+    idx = [cg.index[node] for node in seed if node in cg.index]
+    return unique(np.asarray(idx, dtype=np.int64))
+
+
+def node_mask(cg, nodes):
+    """Boolean mask over the node indices of cg marking nodes, or None."""
+    if nodes is None:
+        return None
+    mask = np.zeros(cg.n, dtype=bool)
+    mask[seed_index(cg, nodes)] = True
+    return mask
+
+
+def expand(indptr, nodes):
+    """
+    Out-edge positions of every node in nodes.
+    Returns the edge positions and, for each, the position in nodes it came from.
+    """
+    start = indptr[nodes]
+    count = indptr[nodes + 1] - start
+    owner = np.repeat(np.arange(len(nodes)), count)
+    offset = np.arange(owner.size) - np.repeat(np.cumsum(count) - count, count)
+    return np.repeat(start, count) + offset, owner
+
+
+def unique(keys, return_counts=False):
+    """
+    Sorted unique values of an integer array (sort based, no hashing),
+    and how often each occurs with return_counts.
+    """
+    keys = np.sort(keys)
+    keep = np.ones(keys.size, dtype=bool)
+    keep[1:] = keys[1:] != keys[:-1]
+    if return_counts:
+        return keys[keep], np.diff(np.append(np.flatnonzero(keep), keys.size))
+    return keys[keep]
+
+
+def chunks(cg, rounds):
+    """
+    Split rounds into batches that keep n * batch below MAX_CELLS and
+    arcs * batch below MAX_ARCS.
+    """
+    size = min(rounds, MAX_CELLS // max(cg.n, 1), MAX_ARCS // max(len(cg.indices), 1))
+    size = max(1, size)
+    for start in range(0, rounds, size):
+        yield min(size, rounds - start)
+
+
+def _frontier(seeds, rounds):
+    node = np.repeat(seeds, rounds)
+    col = np.tile(np.arange(rounds), len(seeds))
+    return node, col
+
+
+def _start(n, seeds, rounds, blocked, extra, extra_seed=None):
+    # blocked nodes are marked active before the seeds so they are never
+    # reached or expanded; hidden counts them per round. extra holds one
+    # more blocked node index per round and extra_seed one more seed, or None.
+    active = np.zeros((n, rounds), dtype=bool)
+    if blocked is not None:
+        active[blocked, :] = True
+    if extra is not None:
+        active[extra, np.arange(rounds)] = True
+    hidden = active.sum(axis=0)
+
+    node, col = _frontier(seeds, rounds)
+    if extra_seed is not None:
+        key = unique(np.concatenate([node * rounds + col, extra_seed * rounds + np.arange(rounds)]))
+        node, col = key // rounds, key % rounds
+    keep = ~active[node, col]
+    node, col = node[keep], col[keep]
+    active[node, col] = True
+    return active, node, col, hidden
+
+
+def _cascade_ic(cg, seeds, rounds, steps, rng, blocked=None, extra=None):
+    active, node, col, hidden = _start(cg.n, seeds, rounds, blocked, extra)
+    counts = np.bincount(col, minlength=rounds)
+
+    for _ in range(steps):
+        if node.size == 0:
+            break
+        edge, owner = expand(cg.indptr, node)
+        hit = rng.random(edge.size) < cg.weights[edge]
+        target, col = cg.indices[edge[hit]].astype(np.int64), col[owner[hit]]
+
+        fresh = ~active[target, col]
+        key = unique(target[fresh] * rounds + col[fresh])
+        node, col = key // rounds, key % rounds
+        active[node, col] = True
+        counts += np.bincount(col, minlength=rounds)
+
+    return counts
+
+
+def _lt_degree(cg, rounds, blocked, extra):
+    # number of neighbours each node has in the graph without the blocked nodes,
+    # per round as an (n, rounds) matrix when extra blocks a node per round
+    n = cg.n
+    src = np.repeat(np.arange(n), np.diff(cg.indptr))
+    live = np.ones(src.size, dtype=bool) if blocked is None else ~blocked[src]
+    degree = np.bincount(cg.indices[live], minlength=n)
+    if extra is None:
+        return degree
+
+    degree = np.repeat(degree[:, None].astype(np.int32), rounds, axis=1)
+    col = np.arange(rounds)
+    if blocked is not None:
+        col = col[~blocked[extra]]
+    edge, owner = expand(cg.indptr, extra[col])
+    key, count = unique(np.multiply(cg.indices[edge], rounds, dtype=np.int64) + col[owner], return_counts=True)
+    degree.reshape(-1)[key] -= count.astype(np.int32)
+    return degree
+
+
+def _cascade_lt(cg, seeds, rounds, steps, rng, blocked=None, extra=None, theta=None, extra_seed=None):
+    n = cg.n
+    # ndlib ThresholdModel compares the active fraction of the neighbours
+    # against a node threshold drawn from {0.01, ..., 0.19}, unless given
+    degree = _lt_degree(cg, rounds, blocked, extra)
+    if theta is None:
+        theta = rng.integers(1, 20, size=(n, rounds), dtype=np.int8)
+
+    active, node, col, hidden = _start(n, seeds, rounds, blocked, extra, extra_seed)
+    influence = np.zeros((n, rounds), dtype=np.int32)
+
+    for _ in range(steps):
+        if node.size == 0:
+            break
+        edge, owner = expand(cg.indptr, node)
+        key = np.multiply(cg.indices[edge], rounds, dtype=np.int64) + col[owner]
+        key, count = unique(key, return_counts=True)
+        influence.reshape(-1)[key] += count.astype(np.int32)
+
+        node, col = key // rounds, key % rounds
+        deg = degree[node] if degree.ndim == 1 else degree[node, col]
+        reached = ~active[node, col] & (influence[node, col] * 100 >= theta[node, col].astype(np.int64) * deg)
+        node, col = node[reached], col[reached]
+        active[node, col] = True
+
+    return active.sum(axis=0) - hidden
+
+
+def _cascade_si(cg, seeds, rounds, steps, beta, rng, blocked=None, extra=None):
+    n = cg.n
+    active, node, col, hidden = _start(n, seeds, rounds, blocked, extra)
+    influence = np.zeros((n, rounds), dtype=np.int32)
+    exposed = np.empty(0, dtype=np.int64)
+
+    for _ in range(steps):
+        edge, owner = expand(cg.indptr, node)
+        key = np.multiply(cg.indices[edge], rounds, dtype=np.int64) + col[owner]
+        key, count = unique(key, return_counts=True)
+        influence.reshape(-1)[key] += count.astype(np.int32)
+
+        # susceptible pairs with at least one infected neighbour
+        fresh = ~active.reshape(-1)[key]
+        exposed = unique(np.concatenate([exposed, key[fresh]]))
+        if exposed.size == 0:
+            break
+        node, col = exposed // rounds, exposed % rounds
+        p = 1 - (1 - beta) ** influence[node, col]
+        hit = rng.random(exposed.size) < p
+
+        node, col = node[hit], col[hit]
+        active[node, col] = True
+        exposed = exposed[~hit]
+
+    return active.sum(axis=0) - hidden
+
+
+def _cascade(cg, seeds, model, rounds, steps, beta, rng, blocked=None, extra=None):
+    if model == 'IC':
+        return _cascade_ic(cg, seeds, rounds, steps, rng, blocked, extra)
+    elif model == 'LT':
+        return _cascade_lt(cg, seeds, rounds, steps, rng, blocked, extra)
+    elif model == 'SI':
+        return _cascade_si(cg, seeds, rounds, steps, beta, rng, blocked, extra)
+    raise ValueError(f"Unknown diffusion model {model}")
+
+
+def simulate(cg, seed, model='IC', rounds=100, steps=4, beta=0.1, random_state=None, blocked=None):
+    """
+    Run rounds independent cascades of model from seed on a CompiledGraph.
+    blocked is an optional boolean mask over the node indices; blocked nodes
+    behave as if removed from the graph.
+    Returns the number of infected nodes after steps iterations, per round.
+    """
+    rng = check_random_state(random_state)
+    seeds = seed_index(cg, seed)
+    if model not in ('IC', 'LT', 'SI'):
+        raise ValueError(f"Unknown diffusion model {model}")
+
+    result = []
+    for size in chunks(cg, rounds):
+        result.append(_cascade(cg, seeds, model, size, steps, beta, rng, blocked))
+
+    return np.concatenate(result) if result else np.empty(0, dtype=np.int64)
+
+
+def sir_history(cg, seed, iterations, beta, gamma, random_state=None):
+    """
+    One SIR epidemic from the infected seed nodes with the semantics of
+    ndlib's SIRModel: every iteration each infected node infects each
+    susceptible out-neighbour with probability beta, then recovers with
+    probability gamma. Returns the (iterations, n) int8 node states
+    (0 susceptible, 1 infected, 2 removed), row 0 holding the seeds.
+    """
+    rng = check_random_state(random_state)
+    history = np.zeros((iterations, cg.n), dtype=np.int8)
+    if not iterations:
+        return history
+    history[0, seed_index(cg, seed)] = 1
+
+    for t in range(1, iterations):
+        state = history[t - 1]
+        infected = np.flatnonzero(state == 1)
+        if not infected.size:
+            history[t:] = state
+            break
+        edge, _ = expand(cg.indptr, infected)
+        hit = cg.indices[edge[rng.random(edge.size) < beta]]
+
+        history[t] = state
+        history[t, hit[state[hit] == 0]] = 1
+        history[t, infected[rng.random(infected.size) < gamma]] = 2
+    return history
+
+
+def blocking_spreads(cg, seed, candidates, model='IC', rounds=100, steps=4, beta=0.1, random_state=None, blocked=None):
+    """
+    Mean spread of seed when each of the candidates, given as node indices,
+    is blocked in addition to the blocked mask. All candidates are simulated
+    together, rounds columns each, in batches as in chunks.
+    """
+    rng = check_random_state(random_state)
+    seeds = seed_index(cg, seed)
+    if model not in ('IC', 'LT', 'SI'):
+        raise ValueError(f"Unknown diffusion model {model}")
+
+    extra = np.repeat(np.asarray(candidates, dtype=np.int64), rounds)
+    total = np.zeros(len(candidates))
+    start = 0
+    for size in chunks(cg, extra.size):
+        counts = _cascade(cg, seeds, model, size, steps, beta, rng, blocked, extra[start:start + size])
+        total += np.bincount(np.arange(start, start + size) // rounds, weights=counts, minlength=len(candidates))
+        start += size
+
+    return total / rounds
+
+
+class SpreadCache:
+    """
+    Memoized mean spread of seed sets on a compiled graph.
+    Every seed set simulates with its own stream(cg, key, seed), so
+    re-evaluating a set is free and gives the same estimate.
+    """
+
+    def __init__(self, cg, model='IC', rounds=100, steps=4, beta=0.1, key=0):
+        self.cg = cg
+        self.model, self.rounds, self.steps, self.beta = model, rounds, steps, beta
+        self.key = key
+        self.cache = {}
+
+    def __call__(self, seed):
+        k = seed_index(self.cg, seed).tobytes()
+        if k not in self.cache:
+            rng = np.random.default_rng(stream(self.cg, self.key, seed))
+            self.cache[k] = simulate(self.cg, seed, self.model, self.rounds, self.steps, self.beta, rng).mean()
+        return self.cache[k]
+
+    def gain(self, seed, node):
+        """Marginal gain of adding node to seed."""
+        return self(list(seed) + [node]) - self(seed)
+
+
+# process pool: every worker receives the compiled graph once, through the
+# pool initializer, and tasks only carry seed sets and random streams
+_worker_graph = None
+
+
+def _init_worker(cg):
+    global _worker_graph
+    _worker_graph = cg
+
+
+def _worker_spread(task):
+    seed, model, rounds, steps, beta, stream = task
+    return simulate(_worker_graph, seed, model, rounds, steps, beta, np.random.default_rng(stream)).mean()
+
+
+def pool(cg, workers=None):
+    """
+    Process pool sharing cg with every worker, for use in a with statement.
+    workers=None or 1 gives a serial context yielding None.
+    """
+    if workers is None or workers == 1:
+        return nullcontext(None)
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cg,))
+
+
+def spreads(cg, seed_sets, streams, model='IC', rounds=100, steps=4, beta=0.1, executor=None):
+    """
+    Mean spread of every seed set, each simulated with its own
+    np.random.SeedSequence so the result does not depend on the workers.
+    """
+    tasks = [(seed, model, rounds, steps, beta, stream) for seed, stream in zip(seed_sets, streams)]
+    if executor is None:
+        return np.array([simulate(cg, *task[:-1], np.random.default_rng(task[-1])).mean() for task in tasks])
+
+    chunksize = max(1, len(tasks) // (4 * (os.cpu_count() or 1)))
+    return np.fromiter(executor.map(_worker_spread, tasks, chunksize=chunksize), dtype=float, count=len(tasks))
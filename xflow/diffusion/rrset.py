@@ -0,0 +1,193 @@
+import numpy as np
+
+from xflow.diffusion import engine
+
+# Reverse-reachable (RR) sets for sketch based influence maximization.
+#
+# RR sets are sampled in batches over the reverse CSR adjacency of a
+# CompiledGraph. A batch of sets is stored as flat arrays: members holds the
+# nodes of all sets back to back and offsets[i]:offsets[i + 1] delimits set i.
+# While a batch is sampled, (set, node) pairs are marked in a visited array
+# of batch * n flags, which is cleared again through the visited keys only.
+
+
+def _batch_ic(cg, key, steps, beta, seen, rng):
+    # reverse BFS flipping one coin per incoming edge
+    n = cg.n
+    seen[key] = True
+    visited = [key]
+    depth = 0
+    while key.size and (steps is None or depth < steps):
+        depth += 1
+        node, sid = key % n, key // n
+        edge, owner = engine.expand(cg.rindptr, node)
+        hit = rng.random(edge.size) < cg.rweights[edge]
+
+        key = sid[owner[hit]] * n + cg.rindices[edge[hit]]
+        key = engine.unique(key[~seen[key]])
+        seen[key] = True
+        visited.append(key)
+    return visited
+
+
+def _batch_lt(cg, key, steps, beta, seen, rng):
+    # live-edge form of classic weighted LT with in-weights 1 / in-degree and
+    # thresholds uniform in [0, 1]: every node keeps exactly one random
+    # incoming edge, so an RR set is a reverse random walk that stops at a
+    # visited node. This is not ndlib's ThresholdModel run by LT() and the
+    # engine, whose thresholds are drawn from {0.01, ..., 0.19}
+    n = cg.n
+    degree = np.diff(cg.rindptr)
+    seen[key] = True
+    visited = [key]
+    depth = 0
+    while key.size and (steps is None or depth < steps):
+        depth += 1
+        node = key % n
+        live = degree[node] > 0
+        key, node = key[live], node[live]
+
+        pick = cg.rindptr[node] + (rng.random(node.size) * degree[node]).astype(np.int64)
+        key = key - node + cg.rindices[pick]
+        key = key[~seen[key]]
+        seen[key] = True
+        visited.append(key)
+    return visited
+
+
+def _batch_si(cg, key, steps, beta, seen, rng):
+    # SI as first passage percolation: infection crosses every edge after a
+    # geometric(beta) delay, and an RR set holds the nodes within total delay
+    # steps of the root. Nodes are settled in order of arrival (Dijkstra with
+    # integer delays); pending holds tentative (key, arrival) pairs.
+    n = cg.n
+    horizon = np.inf if steps is None else steps
+    pending, arrival = key, np.zeros(key.size, dtype=np.int64)
+    visited = []
+    while pending.size:
+        t = arrival.min()
+        now = arrival == t
+        key = engine.unique(pending[now])
+        key = key[~seen[key]]
+        seen[key] = True
+        visited.append(key)
+
+        node, sid = key % n, key // n
+        edge, owner = engine.expand(cg.rindptr, node)
+        delay = t + rng.geometric(beta, edge.size)
+        hit = delay <= horizon
+
+        reached = sid[owner[hit]] * n + cg.rindices[edge[hit]]
+        pending = np.concatenate([pending[~now], reached])
+        arrival = np.concatenate([arrival[~now], delay[hit]])
+        fresh = ~seen[pending]
+        pending, arrival = pending[fresh], arrival[fresh]
+    return visited
+
+
+_SAMPLERS = {'IC': _batch_ic, 'LT': _batch_lt, 'SI': _batch_si}
+
+
+def sample(cg, count, model='IC', steps=None, beta=0.1, random_state=None):
+    """
+    Sample count RR sets under model, each rooted at a uniformly random node.
+    steps bounds the number of diffusion steps, None samples full sets.
+    Returns (offsets, members) with int32 members.
+    """
+    if model not in _SAMPLERS:
+        raise ValueError(f"Unknown diffusion model {model}")
+    batch_rr = _SAMPLERS[model]
+
+    rng = engine.check_random_state(random_state)
+    n = cg.n
+    batch = max(1, min(count, engine.MAX_CELLS // max(n, 1)))
+    seen = np.zeros(batch * n, dtype=bool)
+
+    members, sizes = [], []
+    for start in range(0, count, batch):
+        size = min(batch, count - start)
+        key = np.arange(size, dtype=np.int64) * n + rng.integers(n, size=size)
+        key = np.sort(np.concatenate(batch_rr(cg, key, steps, beta, seen, rng)))
+        seen[key] = False
+        members.append((key % n).astype(np.int32))
+        sizes.append(np.bincount(key // n, minlength=size))
+
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    if count:
+        np.cumsum(np.concatenate(sizes), out=offsets[1:])
+    members = np.concatenate(members) if members else np.empty(0, dtype=np.int32)
+    return offsets, members
+
+
+def join(parts):
+    """Concatenate a list of (offsets, members) collections into one."""
+    offsets = [np.zeros(1, dtype=np.int64)]
+    members = []
+    total = 0
+    for off, mem in parts:
+        offsets.append(off[1:] + total)
+        members.append(mem)
+        total += len(mem)
+    members = np.concatenate(members) if members else np.empty(0, dtype=np.int32)
+    return np.concatenate(offsets), members
+
+
+def coverage(offsets, members, n, nodes):
+    """Number of RR sets containing at least one of nodes."""
+    mask = np.zeros(n, dtype=bool)
+    mask[list(nodes)] = True
+    sid = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    return int(np.count_nonzero(np.bincount(sid[mask[members]], minlength=len(offsets) - 1)))
+
+
+def _top(coverage, k):
+    # sum of the k largest positive marginal coverages
+    n = len(coverage)
+    top = np.partition(coverage, n - k)[n - k:] if k < n else coverage
+    return int(top[top > 0].sum())
+
+
+def max_coverage(offsets, members, n, k, return_bound=False):
+    """
+    Greedy maximum coverage: pick k nodes covering the most RR sets.
+    Keeps an inverted node -> RR set index and per node coverage counters
+    that are decremented as sets get covered.
+    Returns the node indices and the number of covered sets. With
+    return_bound, also an upper bound on the coverage of the best k nodes:
+    the minimum over the greedy steps of the covered sets plus the k largest
+    marginal coverages.
+    """
+    count = len(offsets) - 1
+    sid = np.repeat(np.arange(count), np.diff(offsets))
+
+    # inverted index: sets containing node v are sets[index[v]:index[v + 1]]
+    order = np.argsort(members, kind='stable')
+    sets = sid[order]
+    index = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(members, minlength=n), out=index[1:])
+
+    coverage = np.diff(index)
+    covered = np.zeros(count, dtype=bool)
+    total = 0
+    bound = count
+
+    selected = []
+    for _ in range(min(k, n)):
+        if return_bound:
+            bound = min(bound, total + _top(coverage, k))
+
+        v = int(np.argmax(coverage))
+        selected.append(v)
+
+        hit = sets[index[v]:index[v + 1]]
+        hit = hit[~covered[hit]]
+        covered[hit] = True
+        total += hit.size
+
+        edge, _ = engine.expand(offsets, hit)
+        coverage = coverage - np.bincount(members[edge], minlength=n)
+        coverage[selected] = -1
+
+    if return_bound:
+        return selected, total, min(bound, total + _top(coverage, k))
+    return selected, total
@@ -0,0 +1,55 @@
+import pytest
+import networkx as nx
+import numpy as np
+import ndlib.models.ModelConfig as mc
+
+from xflow.diffusion import engine
+from xflow.diffusion.crn import Worlds
+from xflow.compiled import compile_graph
+
+
+def weighted(g, weight):
+    config = mc.Configuration()
+    for a, b in g.edges():
+        config.add_edge_configuration("threshold", (a, b), weight)
+    return compile_graph(g, config)
+
+
+def test_counts_on_certain_worlds():
+    cg = weighted(nx.path_graph(20), 1.0)
+    assert Worlds(cg, 'IC', rounds=3).counts([0]).tolist() == [5] * 3
+    assert Worlds(cg, 'SI', rounds=3, beta=1.0).counts([10]).tolist() == [9] * 3
+    assert Worlds(cg, 'LT', rounds=3).counts([0]).tolist() == [5] * 3
+    assert Worlds(cg, 'IC', rounds=3, steps=2)([0, 19]) == 6
+
+
+@pytest.mark.parametrize('model', ['IC', 'LT', 'SI'])
+def test_gains_match_spreads(model):
+    cg = weighted(nx.gnp_random_graph(60, 0.05, seed=1, directed=True), 0.4)
+    worlds = Worlds(cg, model, rounds=50, beta=0.4, random_state=0)
+    gains = worlds.gains([0, 1], [2, 3, 0])
+    expected = [worlds([0, 1, v]) - worlds([0, 1]) for v in [2, 3, 0]]
+    assert np.allclose(gains, expected)
+    assert gains[-1] == 0
+    assert worlds.gain([0, 1], 2) == pytest.approx(gains[0])
+
+
+def test_spread_is_unbiased():
+    cg = weighted(nx.gnp_random_graph(60, 0.08, seed=2), 0.3)
+    for model in ['IC', 'SI']:
+        spread = Worlds(cg, model, rounds=4000, beta=0.3, random_state=0)([0])
+        expected = engine.simulate(cg, [0], model, rounds=4000, beta=0.3, random_state=1).mean()
+        assert abs(spread - expected) < 0.05 * expected
+
+
+def test_blocking_spreads_match_subgraphs():
+    cg = weighted(nx.gnp_random_graph(40, 0.1, seed=1), 1.0)
+    blocked = np.zeros(cg.n, dtype=bool)
+    blocked[[2, 3]] = True
+    candidates = [0, 4, 9]
+    for model in ['IC', 'SI']:
+        spreads = Worlds(cg, model, rounds=4, beta=1.0).blocking_spreads([0, 1], candidates, blocked)
+        for c, spread in zip(candidates, spreads):
+            keep = ~blocked
+            keep[c] = False
+            assert spread == engine.simulate(cg.subgraph(keep), [0, 1], model, rounds=4, beta=1.0).mean()
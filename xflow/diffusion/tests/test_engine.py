@@ -0,0 +1,104 @@
+import pytest
+import networkx as nx
+import numpy as np
+import ndlib.models.ModelConfig as mc
+
+from xflow.diffusion import IC, LT, SI
+from xflow.diffusion import engine
+from xflow.compiled import compile_graph
+
+
+def weighted(g, weight):
+    config = mc.Configuration()
+    for a, b in g.edges():
+        g[a][b]['weight'] = weight
+        config.add_edge_configuration("threshold", (a, b), weight)
+    return g, config
+
+
+def test_ic_bounds():
+    g, config = weighted(nx.path_graph(20), 1.0)
+    assert IC(g, config, [0], rounds=5) == [5] * 5
+    assert IC(g, config, [0], rounds=5, steps=10) == [11] * 5
+    g, config = weighted(nx.path_graph(20), 0.0)
+    assert IC(g, config, [0, 0, 3], rounds=5) == [2] * 5
+
+
+def test_lt_and_si_bounds():
+    g, config = weighted(nx.path_graph(20), 1.0)
+    # a single active neighbour always exceeds the threshold on a path
+    assert LT(g, config, [0], rounds=3) == [5] * 3
+    assert SI(g, config, [10], rounds=3, beta=1.0) == [9] * 3
+    assert SI(g, config, [10], rounds=3, beta=0.0) == [1] * 3
+
+
+def test_unknown_seeds_are_ignored():
+    g, config = weighted(nx.path_graph(5), 1.0)
+    assert IC(g, config, ['missing'], rounds=2) == [0, 0]
+
+
+def test_random_state():
+    g, config = weighted(nx.connected_watts_strogatz_graph(200, 6, 0.1), 0.2)
+    for fn in [IC, LT, SI]:
+        a = fn(g, config, [0, 1], rounds=50, random_state=7)
+        b = fn(g, config, [0, 1], rounds=50, random_state=7)
+        assert a == b
+        assert len(a) == 50
+
+
+def test_chunked_rounds(monkeypatch):
+    g, config = weighted(nx.path_graph(20), 1.0)
+    monkeypatch.setattr(engine, 'MAX_CELLS', 40)
+    assert IC(g, config, [0], rounds=7) == [5] * 7
+
+
+def test_unknown_model():
+    g, config = weighted(nx.path_graph(5), 1.0)
+    cg = compile_graph(g, config)
+    with pytest.raises(ValueError):
+        engine.simulate(cg, [0], model='SIR')
+
+
+def test_spread_cache():
+    g, config = weighted(nx.connected_watts_strogatz_graph(100, 6, 0.1), 0.2)
+    spread = engine.SpreadCache(compile_graph(g, config), 'IC', rounds=20, key=4)
+    first = spread([3, 1])
+    assert spread([1, 3]) == first
+    assert len(spread.cache) == 1
+    assert spread.gain([1], 3) == first - spread([1])
+
+
+def test_blocked_nodes():
+    g, config = weighted(nx.path_graph(20), 1.0)
+    assert IC(g, config, [5], rounds=3, blocked_nodes=[6]) == [5] * 3
+    assert LT(g, config, [5], rounds=3, blocked_nodes=[5]) == [0] * 3
+    assert SI(g, config, [5], rounds=3, beta=1.0, blocked_nodes=[3, 7]) == [3] * 3
+
+
+def test_blocking_spreads_match_subgraphs():
+    g, config = weighted(nx.gnp_random_graph(40, 0.1, seed=1), 1.0)
+    cg = compile_graph(g, config)
+    blocked = np.zeros(cg.n, dtype=bool)
+    blocked[[2, 3]] = True
+    candidates = [0, 4, 9]
+    for model in ['IC', 'SI']:
+        spreads = engine.blocking_spreads(cg, [0, 1], candidates, model, rounds=4, beta=1.0, blocked=blocked)
+        for c, spread in zip(candidates, spreads):
+            keep = ~blocked
+            keep[c] = False
+            assert spread == engine.simulate(cg.subgraph(keep), [0, 1], model, rounds=4, beta=1.0).mean()
+
+
+def test_sir_history():
+    g, config = weighted(nx.path_graph(10), 1.0)
+    cg = compile_graph(g, config)
+    history = engine.sir_history(cg, [0], 5, beta=1.0, gamma=0.0)
+    assert history.dtype == np.int8 and history.shape == (5, 10)
+    assert [int((row == 1).sum()) for row in history] == [1, 2, 3, 4, 5]
+
+    # with gamma = 1 every infected node is removed the iteration after
+    history = engine.sir_history(cg, [0], 4, beta=1.0, gamma=1.0)
+    assert history[3].tolist() == [2, 2, 2, 1] + [0] * 6
+
+    history = engine.sir_history(cg, [0, 5], 30, beta=0.5, gamma=0.3, random_state=0)
+    assert np.all(np.diff(history, axis=0) >= 0)
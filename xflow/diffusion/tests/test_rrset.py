@@ -0,0 +1,109 @@
+import networkx as nx
+import numpy as np
+import ndlib.models.ModelConfig as mc
+
+from xflow.diffusion import engine, rrset
+from xflow.compiled import compile_graph
+
+
+def weighted(g, weight):
+    config = mc.Configuration()
+    for a, b in g.edges():
+        config.add_edge_configuration("threshold", (a, b), weight)
+    return compile_graph(g, config)
+
+
+def test_sample_layout():
+    cg = weighted(nx.path_graph(10), 0.5)
+    offsets, members = rrset.sample(cg, 50, random_state=0)
+    assert len(offsets) == 51
+    assert offsets[-1] == len(members)
+    assert members.dtype == np.int32
+    for i in range(50):
+        rr = members[offsets[i]:offsets[i + 1]]
+        assert len(rr) >= 1
+        assert len(set(rr.tolist())) == len(rr)
+
+
+def test_sample_follows_reverse_edges():
+    # on a directed path with certain edges, an RR set is every node upstream
+    cg = weighted(nx.DiGraph([(0, 1), (1, 2), (2, 3)]), 1.0)
+    offsets, members = rrset.sample(cg, 20, random_state=1)
+    for i in range(20):
+        rr = sorted(members[offsets[i]:offsets[i + 1]].tolist())
+        assert rr == list(range(rr[-1] + 1))
+    offsets, members = rrset.sample(cg, 20, steps=1, random_state=1)
+    assert np.diff(offsets).max() <= 2
+
+
+def test_max_coverage():
+    # sets {0, 1}, {1, 2}, {1}, {3}
+    offsets = np.array([0, 2, 4, 5, 6])
+    members = np.array([0, 1, 1, 2, 1, 3], dtype=np.int32)
+    selected, covered = rrset.max_coverage(offsets, members, 4, 2)
+    assert selected == [1, 3]
+    assert covered == 4
+
+
+def test_sample_lt_and_si():
+    cg = weighted(nx.DiGraph([(0, 1), (1, 2), (2, 3)]), 1.0)
+    # every node has a single in-neighbour, so the walk is the upstream path
+    offsets, members = rrset.sample(cg, 20, 'LT', random_state=2)
+    for i in range(20):
+        rr = sorted(members[offsets[i]:offsets[i + 1]].tolist())
+        assert rr == list(range(rr[-1] + 1))
+    # beta=1 infects a neighbour every step: sets are the nodes within steps hops
+    offsets, members = rrset.sample(cg, 20, 'SI', steps=2, beta=1.0, random_state=2)
+    for i in range(20):
+        rr = sorted(members[offsets[i]:offsets[i + 1]].tolist())
+        assert rr == list(range(max(rr[-1] - 2, 0), rr[-1] + 1))
+
+
+def test_sample_unbiased_si():
+    # n * fraction of RR sets hit by a seed set estimates its SI spread
+    cg = weighted(nx.gnp_random_graph(30, 0.15, seed=1), 1.0)
+    offsets, members = rrset.sample(cg, 40000, 'SI', steps=4, beta=0.2, random_state=3)
+    estimate = 30 * rrset.coverage(offsets, members, 30, [0, 1]) / 40000
+    spread = engine.simulate(cg, [0, 1], 'SI', rounds=4000, beta=0.2, random_state=4).mean()
+    assert abs(estimate - spread) < 0.05 * spread
+
+
+def test_join_and_bound():
+    a = (np.array([0, 2, 3]), np.array([0, 1, 1], dtype=np.int32))
+    b = (np.array([0, 1]), np.array([3], dtype=np.int32))
+    offsets, members = rrset.join([a, b])
+    assert offsets.tolist() == [0, 2, 3, 4]
+    assert members.tolist() == [0, 1, 1, 3]
+    selected, covered, bound = rrset.max_coverage(offsets, members, 4, 1, return_bound=True)
+    assert selected == [1] and covered == 2
+    assert covered <= bound <= 3
+
+
+def test_sample_lt_is_classic_lt():
+    # RR sets estimate classic LT (in-weights 1 / in-degree, thresholds
+    # uniform in [0, 1]), simulated forward here as its live-edge graph:
+    # every node keeps one uniformly random incoming edge
+    g = nx.gnp_random_graph(30, 0.15, seed=1, directed=True)
+    cg = weighted(g, 1.0)
+    rng = np.random.default_rng(5)
+    spreads = []
+    for _ in range(4000):
+        live = nx.DiGraph()
+        live.add_nodes_from(g)
+        for v in g:
+            parents = list(g.predecessors(v))
+            if parents:
+                live.add_edge(parents[rng.integers(len(parents))], v)
+        reached = nx.multi_source_dijkstra_path_length(live, {0, 1}, cutoff=4)
+        spreads.append(len(reached))
+    spread = np.mean(spreads)
+
+    offsets, members = rrset.sample(cg, 40000, 'LT', steps=4, random_state=3)
+    estimate = 30 * rrset.coverage(offsets, members, 30, [0, 1]) / 40000
+    assert abs(estimate - spread) < 0.05 * spread
+
+    # LT() and the engine run ndlib's ThresholdModel instead, thresholds in
+    # {0.01, ..., 0.19} against the active fraction of all neighbours, and
+    # spread much further; IMM and OPIM_C reject model='LT' for this reason
+    ndlib_spread = engine.simulate(cg, [0, 1], 'LT', rounds=4000, random_state=4).mean()
+    assert ndlib_spread > 2 * spread
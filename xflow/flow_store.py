@@ -0,0 +1,151 @@
+import os
+import json
+import numpy as np
+
+from xflow.compiled import CompiledGraph, compile_graph
+
+# On-disk store for flow_tasks samples.
+#
+# A store is a directory holding
+#   states_00000.npy, ...   int8 node states, (samples, observations, nodes)
+#                           per chunk of chunk_size samples
+#   graphs/<id>/            every base graph once, see CompiledGraph.save
+#   meta.npz                one column per sample parameter
+#   store.json              layout of the chunks
+# The reader memory-maps the chunks, so a store can be far larger than RAM.
+
+
+class FlowWriter:
+    """
+    Streams samples of forward/backward with obs_type='numpy' to a store at
+    path. Consecutive samples that share their base graph object, as
+    samples_per_graph produces them, share it on disk too.
+    """
+
+    def __init__(self, path, chunk_size=1024):
+        self.path = path
+        self.chunk_size = chunk_size
+        os.makedirs(os.path.join(path, 'graphs'), exist_ok=True)
+
+        self.buffer = []
+        self.chunks = []
+        self.num_graphs = 0
+        # the base graph of the last sample and its id, no earlier graph is kept
+        self.last = None
+        self.meta = {'graph': [], 'time': [], 'beta': [], 'gamma': [], 'fraction_infected': []}
+
+    def _graph_id(self, g):
+        if self.last is None or self.last[0] is not g:
+            gid = self.num_graphs
+            compile_graph(g).save(os.path.join(self.path, 'graphs', str(gid)))
+            self.num_graphs += 1
+            self.last = (g, gid)
+        return self.last[1]
+
+    def append(self, sample):
+        observations = sample['observations']
+        if not observations or not isinstance(observations[0], dict):
+            raise ValueError("Only samples with obs_type='numpy' can be stored")
+
+        self.buffer.append(np.stack([obs['observation'] for obs in observations]).astype(np.int8))
+        model = sample['SIR_config'].config['model']
+        self.meta['graph'].append(self._graph_id(sample['base_graph']))
+        self.meta['time'].append([obs['time'] for obs in observations])
+        for name in ('beta', 'gamma', 'fraction_infected'):
+            self.meta[name].append(model.get(name, np.nan))
+
+        if len(self.buffer) == self.chunk_size:
+            self._flush()
+
+    def _flush(self):
+        if not self.buffer:
+            return
+        shapes = {states.shape for states in self.buffer}
+        if len(shapes) > 1 or (self.chunks and self.chunks[0]['shape'][1:] != list(self.buffer[0].shape)):
+            raise ValueError("All samples of a store need the same number of observations and nodes")
+
+        name = f'states_{len(self.chunks):05d}.npy'
+        np.save(os.path.join(self.path, name), np.stack(self.buffer))
+        self.chunks.append({'file': name, 'shape': [len(self.buffer)] + list(self.buffer[0].shape)})
+        self.buffer = []
+
+    def close(self):
+        self._flush()
+        np.savez(os.path.join(self.path, 'meta.npz'), **{k: np.asarray(v) for k, v in self.meta.items()})
+        with open(os.path.join(self.path, 'store.json'), 'w') as f:
+            json.dump({'chunks': self.chunks, 'graphs': self.num_graphs}, f)
+        self.last = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write(samples, path, chunk_size=1024):
+    """Write an iterable of samples to a store at path and open it."""
+    with FlowWriter(path, chunk_size) as writer:
+        for sample in samples:
+            writer.append(sample)
+    return FlowStore(path)
+
+
+class FlowStore:
+    """
+    Lazy reader of a store written by FlowWriter. Node states are served
+    from memory-mapped chunks; store[i] rebuilds the observations of a
+    sample in the format of forward/backward.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'store.json')) as f:
+            layout = json.load(f)
+        self.chunks = [np.load(os.path.join(path, c['file']), mmap_mode='r') for c in layout['chunks']]
+        self.offsets = np.cumsum([0] + [c['shape'][0] for c in layout['chunks']])
+        self.num_graphs = layout['graphs']
+
+        with np.load(os.path.join(path, 'meta.npz')) as meta:
+            self.meta = {k: meta[k] for k in meta.files}
+        self._graphs = {}
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def states(self, idx):
+        """int8 node states of the samples idx, (samples, observations, nodes)."""
+        idx = np.atleast_1d(np.asarray(idx, dtype=np.int64))
+        chunk = np.searchsorted(self.offsets, idx, side='right') - 1
+        out = np.empty((len(idx),) + self.chunks[0].shape[1:], dtype=np.int8) if self.chunks else None
+        for c in np.unique(chunk):
+            hit = chunk == c
+            out[hit] = self.chunks[c][idx[hit] - self.offsets[c]]
+        return out
+
+    def graph(self, gid):
+        """Base graph gid as a memory-mapped CompiledGraph."""
+        if gid not in self._graphs:
+            self._graphs[gid] = CompiledGraph.load(os.path.join(self.path, 'graphs', str(gid)))
+        return self._graphs[gid]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        states = self.states(i)[0]
+        return {'observations': [{'time': int(t), 'observation': s} for t, s in zip(self.meta['time'][i], states)],
+                'graph': int(self.meta['graph'][i]),
+                'beta': float(self.meta['beta'][i]),
+                'gamma': float(self.meta['gamma'][i]),
+                'fraction_infected': float(self.meta['fraction_infected'][i])}
+
+    def batches(self, batch_size=32, shuffle=False, random_state=None):
+        """Yield (sample indices, states) mini-batches."""
+        order = np.arange(len(self))
+        if shuffle:
+            np.random.default_rng(random_state).shuffle(order)
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            yield idx, self.states(idx)
@@ -13,11 +13,19 @@ import random
 import networkx as nx
 from networkx import Graph
 from torch_geometric.data.data import Data, torch
+from torch_geometric.data import Batch
 import xflow
 from xflow.dataset.nx import connSW
+from xflow import flow_store
+from xflow.compiled import CompiledGraph
+from xflow.diffusion import engine
 import ndlib.models.epidemics as ep
 import ndlib.models.ModelConfig as mc
 import warnings
+import weakref
+from scipy.sparse import csgraph
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
 from torch_geometric.utils.convert import from_networkx
 from sklearn.metrics import classification_report, ConfusionMatrixDisplay
 import matplotlib.pyplot as plt
@@ -77,9 +85,9 @@ graph_gen_dict = {'connSW':connSW, 'BA':BA, 'ER':ER} #dictionary of string to gr
                                                      #returns g as networkx grapg and config as ndlib config
                                                      #and accepts values of n (nodes) and beta (edge weight override)
 
-def setup(graph_kind, graph_size, graph_beta, inf_beta, inf_gamma, inf_initial_frac):
-
+def _graph(graph_kind, graph_size, graph_beta):
     #generate a graph
+    g = None
     for name, gen_function in graph_gen_dict.items():
         if name == graph_kind:
             (g, config) = gen_function(n=graph_size, beta=graph_beta)
@@ -87,7 +95,9 @@ def setup(graph_kind, graph_size, graph_beta, inf_beta, inf_gamma, inf_initial_f
     #make sure graph gen was sucessful
     if g is None:
         raise Exception('Graph generation function not known.')
+    return g, config
 
+def _sir_parameters(inf_beta, inf_gamma, inf_initial_frac):
     #sir model setup
     if inf_beta is None:
         inf_beta = random.uniform(0.01,0.06)
@@ -95,19 +105,74 @@ def setup(graph_kind, graph_size, graph_beta, inf_beta, inf_gamma, inf_initial_f
         inf_gamma = random.uniform(0.005,0.03)
     if inf_initial_frac is None:
         inf_initial_frac = random.uniform(0.02,0.05)
+    return inf_beta, inf_gamma, inf_initial_frac
+
+def setup(graph_kind, graph_size, graph_beta, inf_beta, inf_gamma, inf_initial_frac, seed=None):
+
+    (g, config) = _graph(graph_kind, graph_size, graph_beta)
+    inf_beta, inf_gamma, inf_initial_frac = _sir_parameters(inf_beta, inf_gamma, inf_initial_frac)
 
     config.add_model_parameter('beta', inf_beta)
     config.add_model_parameter('gamma', inf_gamma)
     config.add_model_parameter("fraction_infected", inf_initial_frac)
 
-    model = ep.SIRModel(g)
+    # ndlib reseeds np.random when the model is built, None draws a fresh seed
+    model = ep.SIRModel(g, seed=seed)
     model.set_initial_status(config)
 
     return g,model,config
 
-def run_sim(distance, interval_lower, g, model):
+# diameters by graph, kept while the graph lives and checked against its size
+_diameters = weakref.WeakKeyDictionary()
+
+def _bfs(adj, sources):
+    # hop distances from each source, one row per source
+    dist = csgraph.shortest_path(adj, unweighted=True, indices=sources)
+    if np.isinf(dist).any():
+        raise nx.NetworkXError("Found infinite path length because the graph is not connected")
+    return dist
+
+def graph_diameter(g, exact=False):
+    """
+    Diameter of g, memoized per graph. By default a 4-sweep lower bound:
+    double sweeps from the highest degree node and from the middle of the
+    longest path found, a handful of BFS instead of all pairs. exact runs
+    iFUB from that middle node, which BFSes the fringe levels only until
+    the bound is tight.
+    """
+    key = (exact, g.number_of_nodes(), g.number_of_edges())
+    cached = _diameters.get(g)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    adj = nx.to_scipy_sparse_array(g, weight=None, format='csr')
+    start = int(np.argmax(np.diff(adj.indptr)))
+    value = 0
+    for _ in range(2):
+        a = int(np.argmax(_bfs(adj, start)))
+        da = _bfs(adj, a)
+        b = int(np.argmax(da))
+        db = _bfs(adj, b)
+        length = int(da[b])
+        value = max(value, length)
+        start = int(np.flatnonzero((da == length // 2) & (db == length - length // 2))[0])
+
+    if exact:
+        du = _bfs(adj, start)
+        value = max(value, int(du.max()))
+        for level in range(int(du.max()), 0, -1):
+            # every pair within the inner levels is at most 2 * level apart
+            if value >= 2 * level:
+                break
+            fringe = np.flatnonzero(du == level)
+            for i in range(0, len(fringe), 64):
+                value = max(value, int(_bfs(adj, fringe[i:i + 64]).max()))
+    _diameters[g] = (key, value)
+    return value
+
+def _interval_start(distance, interval_lower, g, exact_diameter=False):
     #choose timesteps, dont run longer than needed
-    diameter = nx.diameter(g)
+    diameter = graph_diameter(g, exact_diameter)
     dist_max = max(distance)
     r = interval_lower
     if r < 0:
@@ -118,32 +183,77 @@ def run_sim(distance, interval_lower, g, model):
             r=0
         else:
             r = random.randrange(diameter-dist_max) #choose random timesteps
+    return r
 
+def run_sim(distance, interval_lower, g, model, exact_diameter=False):
+    r = _interval_start(distance, interval_lower, g, exact_diameter)
+    dist_max = max(distance)
 
     #run the simulation
     iterations = model.iteration_bunch(r+dist_max+1, node_status=True)
 
-    node_states_iterations = []
-    node_states = {}
-    for iteration in iterations:
-        if iteration['iteration'] == 0:
-            node_states = {node: status for node, status in iteration['status'].items()}
-        else:
-            for node, status in iteration['status'].items():
-                node_states[node] = status
-        node_states_iterations.append(node_states.copy())
-    #print(node_states_iterations)
-    return node_states_iterations
-
+    # int8 (T, n) history in the node order of g, ndlib reports only the
+    # nodes that changed after iteration 0
+    index = {node: i for i, node in enumerate(g.nodes())}
+    history = np.zeros((len(iterations), len(index)), dtype=np.int8)
+    for t, iteration in enumerate(iterations):
+        if t:
+            history[t] = history[t - 1]
+        changed = iteration['status']
+        if changed:
+            nodes = np.fromiter((index[node] for node in changed), dtype=np.int64, count=len(changed))
+            history[t, nodes] = np.fromiter(changed.values(), dtype=np.int8, count=len(changed))
+    return history
+
+
+def _node_states(node_states, g):
+    # a row of an int8 history as a node -> state dict
+    if isinstance(node_states, dict):
+        return node_states
+    return dict(zip(g.nodes(), node_states.tolist()))
+
+# edge tensors by graph object, built once and kept while the graph lives;
+# forward/backward never modify a base graph after formatting its samples
+_edges = weakref.WeakKeyDictionary()
+
+def _edge_tensors(g):
+    # edge_index and weight edge_attr of g in adjacency order, like from_networkx
+    cached = _edges.get(g)
+    if cached is None:
+        index = {node: i for i, node in enumerate(g.nodes())}
+        src, dst, weight = [], [], []
+        for u, neighbors in g.adjacency():
+            for v, data in neighbors.items():
+                src.append(index[u])
+                dst.append(index[v])
+                weight.append(data.get('weight', 1.0))
+        edge_index = torch.tensor([src, dst], dtype=torch.long).reshape(2, -1)
+        edge_attr = torch.tensor(weight, dtype=torch.float).reshape(-1, 1)
+        cached = _edges[g] = (edge_index, edge_attr)
+    return cached
+
+def _state_tensor(node_states):
+    # node states of one interval as a long tensor
+    if isinstance(node_states, dict):
+        node_states = list(node_states.values())
+    return torch.as_tensor(np.asarray(node_states), dtype=torch.long)
 
 def format_sim_result(intervals, iterations, obs_type, g):
+    """
+    Snapshots of iterations at intervals. obs_type 'numpy' gives dicts of
+    time and state arrays, 'networkx' graph copies, 'torch' PyG Data
+    objects sharing one edge_index and edge_attr, 'torch_batch' those as
+    a Batch and 'torch_temporal' a StaticGraphTemporalSignal of
+    torch_geometric_temporal.
+    """
+    # iterations is a list of node -> state dicts or an int8 (T, n) history
     simulation_result = []
     if obs_type == 'numpy':
         # Get result at each timestep
         for interval in intervals:
             node_states = iterations[interval]
 
-            obs = np.array(list(node_states.values()))
+            obs = np.array(node_states if isinstance(node_states, np.ndarray) else list(node_states.values()))
             # Build the snapshot using the observation at this iteration
             snapshot = {
                 'time': interval,
@@ -154,31 +264,39 @@ def format_sim_result(intervals, iterations, obs_type, g):
 
         return simulation_result
 
-    if obs_type == 'torch':
+    if obs_type in ('torch', 'torch_batch', 'torch_temporal'):
+        # the edge tensors are built once per graph and shared by every
+        # snapshot, only the node features change between intervals
+        edge_index, edge_attr = _edge_tensors(g)
         start = intervals[0]
-        node_states = iterations[start]
-        nx.set_node_attributes(g, node_states, name='state_x')
-        nx.set_node_attributes(g, start, name='time_x')
+        state_x = _state_tensor(iterations[start])
 
         # Get result at each timestep
         for interval in intervals:
-            node_states = iterations[interval]
-            nx.set_node_attributes(g, node_states, name='state_y')
-            nx.set_node_attributes(g, interval, name='time_y')
-
-            obs = from_networkx(g.copy(), group_node_attrs=['state_x', 'time_x', 'time_y'], group_edge_attrs=['weight'])
-            state = np.array(list(node_states.values()))
-            obs.y = torch.tensor(state)
-            obs.time_y = torch.tensor(interval)  # Add the time_y attribute
+            state = _state_tensor(iterations[interval])
+            x = torch.stack([state_x, torch.full_like(state_x, start), torch.full_like(state_x, interval)], dim=1)
+            obs = Data(x=x, edge_index=edge_index, edge_attr=edge_attr, state_y=state, y=state,
+                       time_y=torch.tensor(interval))
 
             # Append the snapshot to sim result
             simulation_result.append(obs)
+
+        if obs_type == 'torch_batch':
+            return Batch.from_data_list(simulation_result)
+        if obs_type == 'torch_temporal':
+            from torch_geometric_temporal.signal import StaticGraphTemporalSignal
+            # extra features become tensors one snapshot at a time, where a
+            # bare integer would be taken as a tensor size
+            return StaticGraphTemporalSignal(edge_index.numpy(), edge_attr[:, 0].numpy(),
+                                             [obs.x.numpy() for obs in simulation_result],
+                                             [obs.y.numpy() for obs in simulation_result],
+                                             time_y=[np.array([interval]) for interval in intervals])
         return simulation_result
-    
+
     if obs_type == 'networkx':
         # Get result at each timestep
         for interval in intervals:
-            node_states = iterations[interval]
+            node_states = _node_states(iterations[interval], g)
             g_copy = g.copy()
             nx.set_node_attributes(g_copy, node_states, name='state_y')
             g_copy.graph['time_y'] = interval  # Store time in graph metadata
@@ -191,6 +309,103 @@ def format_sim_result(intervals, iterations, obs_type, g):
 
 
 
+def _intervals(direction, length, distance):
+    # observed iterations of a history of the given length
+    if direction == 'forward':
+        intervals =[length -max(distance)-1]
+        for d in distance:
+            intervals.append(intervals[0] + d)
+    else:
+        intervals =[length-1]
+        for d in distance:
+            intervals.append(intervals[0] - d)
+    return intervals
+
+def _run_sample(task):
+    # one forward or backward sample; a per-sample seed reseeds random and
+    # np.random (used by the graph generators and ndlib), so the sample does
+    # not depend on the process it runs in
+    direction, seed, distance, obs_type, graph_kind, graph_size, graph_beta, inf_beta, inf_gamma, inf_initial_frac, interval_lower = task
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+
+    (g,inf_model, sir_config) = setup(graph_kind, graph_size, graph_beta, inf_beta, inf_gamma, inf_initial_frac, seed)
+    iterations = run_sim(distance, interval_lower, g, inf_model)
+    intervals = _intervals(direction, len(iterations), distance)
+
+    simulation_result = format_sim_result(intervals, iterations, obs_type, g)
+
+    #observations, the starting graph, the starting SIR model
+    return {'observations': simulation_result,
+            'base_graph': g,
+            'SIR_config': sir_config}
+
+def _run_graph(task):
+    # count samples on one graph, generated and compiled once; the epidemics
+    # run on engine.sir_history and every sample shares the graph object
+    direction, seed, count, distance, obs_type, graph_kind, graph_size, graph_beta, inf_beta, inf_gamma, inf_initial_frac, interval_lower = task
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+
+    (g, _) = _graph(graph_kind, graph_size, graph_beta)
+    cg = CompiledGraph.from_networkx(g)
+
+    samples = []
+    for _ in range(count):
+        beta, gamma, initial_frac = _sir_parameters(inf_beta, inf_gamma, inf_initial_frac)
+        sir_config = mc.Configuration()
+        sir_config.add_model_parameter('beta', beta)
+        sir_config.add_model_parameter('gamma', gamma)
+        sir_config.add_model_parameter("fraction_infected", initial_frac)
+
+        # initial infections drawn like ndlib, at least one node
+        r = _interval_start(distance, interval_lower, g)
+        infected = np.random.choice(cg.n, max(1, int(cg.n * initial_frac)), replace=False)
+        iterations = engine.sir_history(cg, cg.labels(infected), r+max(distance)+1, beta, gamma)
+        intervals = _intervals(direction, len(iterations), distance)
+
+        simulation_result = format_sim_result(intervals, iterations, obs_type, g)
+        samples.append({'observations': simulation_result,
+                        'base_graph': g,
+                        'SIR_config': sir_config})
+    return samples
+
+def _generate(direction, distance, num_results, workers, batch_size, seed, samples_per_graph, *params):
+    # samples in order, batch_size tasks at a time, from a process pool of
+    # workers; a task is one sample, or one graph with samples_per_graph
+    if isinstance(distance,int):
+        distance = [distance]
+
+    if samples_per_graph is None:
+        run, counts = _run_sample, [None] * num_results
+    else:
+        run = _run_graph
+        counts = [min(samples_per_graph, num_results - start) for start in range(0, num_results, samples_per_graph)]
+
+    if seed is None and workers is None and batch_size is None:
+        seeds = [None] * len(counts)
+    else:
+        if seed is None:
+            seed = random.getrandbits(63)
+        seeds = [int(np.random.SeedSequence(seed, spawn_key=(i,)).generate_state(1)[0]) for i in range(len(counts))]
+
+    if batch_size is None:
+        batch_size = max(1, workers or 1)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers is not None and workers > 1 else nullcontext(None)
+
+    with pool as executor:
+        mapper = map if executor is None else executor.map
+        for start in range(0, len(counts), batch_size):
+            tasks = [(direction, task_seed) + ((distance,) if count is None else (count, distance)) + params
+                     for task_seed, count in zip(seeds[start:start + batch_size], counts[start:start + batch_size])]
+            for result in mapper(run, tasks):
+                if samples_per_graph is None:
+                    yield result
+                else:
+                    yield from result
+
 def forward(distance,
             num_results=10,
             obs_type = 'numpy',
@@ -201,29 +416,35 @@ def forward(distance,
             inf_gamma = None,
             inf_initial_frac = None,
             interval_lower = -1,
+            workers = None,
+            batch_size = None,
+            seed = None,
+            path = None,
+            chunk_size = 1024,
+            samples_per_graph = None,
             ):
-
-    if isinstance(distance,int):
-        distance = [distance]
+    """
+    Generate num_results forward samples. seed makes every sample
+    reproducible on its own. With workers or batch_size the samples are
+    generated in a process pool, batch_size at a time, and streamed back
+    in order as a generator instead of a list. With path the samples
+    (obs_type='numpy') are streamed to an on-disk store of chunk_size
+    samples per chunk instead, see xflow.flow_store, and the lazy
+    FlowStore reader is returned.
+    With samples_per_graph, every graph is generated once and carries
+    samples_per_graph epidemics from a vectorized SIR simulator with
+    ndlib's semantics; those samples share the base_graph object and their
+    SIR_config only holds the model parameters.
+    """
 
     #generate results
-    results = []
-    for n in range(num_results):
-        (g,inf_model, sir_config) = setup(graph_kind, graph_size, graph_beta, inf_beta, inf_gamma, inf_initial_frac)
-        iterations = run_sim(distance, interval_lower, g, inf_model)
-
-        intervals =[len(iterations) -max(distance)-1]
-        for d in distance:
-            intervals.append(intervals[0] + d)
-
-        simulation_result = format_sim_result(intervals, iterations, obs_type, g.copy())
-
-        #append two results that are distance apart
-        results.append({'observations': simulation_result,
-                        'base_graph': g,
-                        'SIR_config': sir_config})
-
+    results = _generate('forward', distance, num_results, workers, batch_size, seed, samples_per_graph,
+                        obs_type, graph_kind, graph_size, graph_beta, inf_beta, inf_gamma, inf_initial_frac, interval_lower)
 
+    if path is not None:
+        return flow_store.write(results, path, chunk_size)
+    if workers is None and batch_size is None:
+        return list(results)
     return results
 
 def backward(distance,
@@ -236,28 +457,27 @@ def backward(distance,
             inf_gamma = None,
             inf_initial_frac = None,
             interval_lower = -1,
+            workers = None,
+            batch_size = None,
+            seed = None,
+            path = None,
+            chunk_size = 1024,
+            samples_per_graph = None,
             ):
-
-    if isinstance(distance,int):
-        distance = [distance]
+    """
+    Generate num_results backward samples, with the same workers,
+    batch_size, seed, path, chunk_size and samples_per_graph options as
+    forward.
+    """
 
     #generate results
-    results = []
-    for n in range(num_results):
-        (g,inf_model, sir_config) = setup(graph_kind, graph_size, graph_beta, inf_beta, inf_gamma, inf_initial_frac)
-        iterations = run_sim(distance, interval_lower, g, inf_model)
-
-        intervals =[len(iterations)-1]
-        for d in distance:
-            intervals.append(intervals[0] - d)
-
-        simulation_result = format_sim_result(intervals, iterations, obs_type, g.copy())
-
-        #append observations, the starting graph, the starting SIR model
-        results.append({'observations': simulation_result,
-                        'base_graph': g,
-                        'SIR_config': sir_config})
+    results = _generate('backward', distance, num_results, workers, batch_size, seed, samples_per_graph,
+                        obs_type, graph_kind, graph_size, graph_beta, inf_beta, inf_gamma, inf_initial_frac, interval_lower)
 
+    if path is not None:
+        return flow_store.write(results, path, chunk_size)
+    if workers is None and batch_size is None:
+        return list(results)
     return results
 
 
@@ -309,3 +529,44 @@ def graph_eval(obs_true, obs_pred, display=False):
         print(cr)
 
     return report_dict
+
+def graph_eval_batch(obs_true, obs_pred, num_classes=None):
+    """
+    Per-class precision, recall, f1-score and support and the accuracy of
+    every sample of stacked (samples, nodes) true and predicted states, from
+    one bincount confusion matrix. Classes absent from a sample score 0.
+    Returns a structured array with one record per sample, holding the
+    fields 'confusion' (true x predicted counts), 'precision', 'recall',
+    'f1-score', 'support' and 'accuracy'.
+    """
+    obs_true = np.atleast_2d(np.asarray(obs_true, dtype=np.int64))
+    obs_pred = np.atleast_2d(np.asarray(obs_pred, dtype=np.int64))
+    if obs_true.shape != obs_pred.shape:
+        raise ValueError('Observation inputs must have the same shape')
+    if num_classes is None:
+        num_classes = int(max(obs_true.max(initial=0), obs_pred.max(initial=0))) + 1
+    samples, c = len(obs_true), num_classes
+
+    sample = np.arange(samples)[:, None]
+    confusion = np.bincount(((sample * c + obs_true) * c + obs_pred).ravel(), minlength=samples * c * c)
+    confusion = confusion.reshape(samples, c, c)
+
+    hit = np.diagonal(confusion, axis1=1, axis2=2)
+    support = confusion.sum(axis=2)
+    predicted = confusion.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(predicted > 0, hit / predicted, 0.0)
+        recall = np.where(support > 0, hit / support, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+        accuracy = np.where(support.sum(axis=1) > 0, hit.sum(axis=1) / support.sum(axis=1), 0.0)
+
+    result = np.zeros(samples, dtype=[('confusion', np.int64, (c, c)), ('precision', np.float64, (c,)),
+                                      ('recall', np.float64, (c,)), ('f1-score', np.float64, (c,)),
+                                      ('support', np.int64, (c,)), ('accuracy', np.float64)])
+    result['confusion'] = confusion
+    result['precision'] = precision
+    result['recall'] = recall
+    result['f1-score'] = f1
+    result['support'] = support
+    result['accuracy'] = accuracy
+    return result
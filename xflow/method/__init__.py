@@ -1 +1,14 @@
+import importlib
 
+# submodules are imported on first access (PEP 562)
+_submodules = ['im', 'ibm', 'sl', 'cosasi']
+
+
+def __getattr__(name):
+    if name in _submodules:
+        return importlib.import_module('xflow.method.' + name)
+    raise AttributeError(f"module 'xflow.method' has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + _submodules)
@@ -1,167 +1,133 @@
-import networkx as nx
 import numpy as np
-import ndlib
-import ndlib.models.epidemics as ep
-import ndlib.models.ModelConfig as mc
-import statistics as s
-import random
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
-import time
-from random import uniform, seed
-
-from collections import Counter
-import operator
-import copy
-from xflow.diffusion.SI import SI
-from xflow.diffusion.IC import IC
-from xflow.diffusion.LT import LT
+import scipy.sparse as sp
+import scipy.sparse.linalg as sla
+import heapq
+import math
+from xflow.diffusion import engine, rrset
+from xflow.diffusion.crn import Worlds
+from xflow.compiled import compile_graph
 
 # random
 
 # baselines: simulation based
 
 # greedy
-def greedy(g, config, budget, rounds=100, model='SI', beta=0.1):
+def greedy(g, config, budget, rounds=100, model='SI', beta=0.1, workers=None, random_state=None, crn=False):
+    """
+    workers spreads the candidate evaluations over a process pool. Every
+    seed set simulates with its own random stream derived from random_state,
+    so the selected seeds do not depend on the number of workers.
+    crn=True instead compares all candidates on the same rounds sampled
+    worlds (xflow.diffusion.crn), evaluated in one batch without workers.
+    """
+    g = compile_graph(g, config)
+    key = engine.entropy(random_state)
+    worlds = Worlds(g, model, rounds, beta=beta, random_state=key) if crn else None
 
     selected = []
     candidates = list(g.nodes())
 
-    for i in range(budget):
-
-        max = 0
-        index = -1
-        for node in candidates:
-            seeds = selected + [node]
-
-            if (model == "IC"):
-                result = IC(g, config, seeds, rounds)
-            elif (model == "LT"):
-                result = LT(g, config, seeds, rounds)
-            elif (model == "SI"):
-                result = SI(g, config, seeds, rounds, beta)
-            
-            if s.mean(result) > max:
-                max = s.mean(result)
-                index = node
-
-        selected.append(index)
-        candidates.remove(index)
+    with engine.pool(g, None if crn else workers) as executor:
+        for i in range(budget):
 
-    print(selected)
-    return selected
+            if crn:
+                result = worlds.gains(selected, [g.index[node] for node in candidates])
+            else:
+                seed_sets = [selected + [node] for node in candidates]
+                streams = [engine.stream(g, key, seeds) for seeds in seed_sets]
+                result = engine.spreads(g, seed_sets, streams, model, rounds, beta=beta, executor=executor)
 
-def celf(g, config, budget, rounds=100, model='SI', beta=0.1): 
-    # Find the first node with greedy algorithm
-    
-    # Compute marginal gain for each node
-    candidates = list(g.nodes())
-    #, start_time = list(g.nodes()), time.time()
-    # step 1, call a diffusion function, get the result of list
-    # step 2, calculate the margin gain 
-    if (model == "IC"):
-        marg_gain = [s.mean(IC(g, config, [node])) for node in candidates]
-    elif (model == "LT"):
-        marg_gain = [s.mean(LT(g, config, [node])) for node in candidates]
-    elif (model == "SI"):
-         marg_gain = [s.mean(SI(g, config, [node], beta)) for node in candidates]
-    # Create the sorted list of nodes and their marginal gain 
-    Q = sorted(zip(candidates,marg_gain), key = lambda x: x[1],reverse=True)
-
-    # Select the first node and remove from candidate list
-    selected, spread, Q = [Q[0][0]], Q[0][1], Q[1:]
-    
-    # Find the next budget-1 nodes using the CELF list-sorting procedure
-    
-    for _ in range(budget-1):    
-
-        check = False      
-        while not check:
-            
-            # Recalculate spread of top node
-            current = Q[0][0]
-            
-            # Evaluate the spread function and store the marginal gain in the list
-            if (model == "IC"):
-                Q[0] = (current, s.mean(IC(g, config, selected+[current]), rounds) - spread)
-            elif (model == "LT"):
-                Q[0] = (current, s.mean(LT(g, config, selected+[current]), rounds) - spread)
-            elif (model == "SI"):
-                Q[0] = (current, s.mean(SI(g, config, selected+[current]), rounds, beta) - spread)
-
-            # Re-sort the list
-            Q = sorted(Q, key = lambda x: x[1], reverse=True)
-
-            # Check if previous top node stayed on top after the sort
-            check = Q[0][0] == current
-
-        # Select the next node
-        selected.append(Q[0][0])
-        spread = Q[0][1]
-        
-        # Remove the selected node from the list
-        Q = Q[1:]
+            index = candidates[int(np.argmax(result))]
+            selected.append(index)
+            candidates.remove(index)
 
     print(selected)
-    return(selected)
-
-def celfpp(g, config, budget, rounds=100, model='SI', beta=0.1):
+    return selected
 
-    # Compute marginal gain for each node
-    candidates = list(g.nodes())
-    if (model == "IC"):
-        marg_gain = [s.mean(IC(g, config, [node], rounds)) for node in candidates]
-    elif (model == "LT"):
-        marg_gain = [s.mean(LT(g, config, [node], rounds)) for node in candidates]
-    elif (model == "SI"):
-        marg_gain = [s.mean(SI(g, config, [node], rounds, beta)) for node in candidates]
-
-    # Create the sorted list of nodes and their marginal gain 
-    Q = sorted(zip(candidates, marg_gain), key = lambda x: x[1], reverse=True)
-
-    # Select the first node and remove from candidate list
-    selected, spread, Q = [Q[0][0]], Q[0][1], Q[1:]
-
-    # Initialize last_seed as the first selected node
-    last_seed = selected[0]
-    
-    # Find the next budget-1 nodes using the CELF++ procedure
-    for _ in range(budget - 1):    
-        check = False
-        while not check:
-            # Get current node and its previous computed marginal gain
-            current, old_gain = Q[0][0], Q[0][1]
-
-            # Check if the last added seed has changed
-            if current != last_seed:
-                # Compute new marginal gain
-                if (model == "IC"):
-                    new_gain = s.mean(IC(g, config, selected+[current], rounds)) - spread
-                elif (model == "LT"):
-                    new_gain = s.mean(LT(g, config, selected+[current], rounds)) - spread
-                elif (model == "SI"):
-                    new_gain = s.mean(SI(g, config, selected+[current], rounds, beta)) - spread
-            else:
-                # If the last added seed hasn't changed, the marginal gain remains the same
-                new_gain = old_gain
+def celf(g, config, budget, rounds=100, model='SI', beta=0.1, random_state=None, crn=False):
+    """
+    CELF with a lazy-forward heap. Each entry carries the seed-set size its
+    marginal gain was computed at; a popped node whose gain is up to date
+    is selected, otherwise it is re-evaluated and pushed back.
+    crn=True evaluates every gain on the same sampled worlds.
+    """
+    g = compile_graph(g, config)
+    if crn:
+        spread = Worlds(g, model, rounds, beta=beta, random_state=random_state)
+    else:
+        spread = engine.SpreadCache(g, model, rounds, beta=beta, key=engine.entropy(random_state))
 
-            # Update the marginal gain of the current node
-            Q[0] = (current, new_gain)
+    # (-marginal gain, node index, |S| at evaluation)
+    Q = [(-spread([node]), g.index[node], 0) for node in g.nodes()]
+    heapq.heapify(Q)
 
-            # Re-sort the list
-            Q = sorted(Q, key = lambda x: x[1], reverse=True)
+    selected = []
+    while len(selected) < budget and Q:
+        gain, u, stamp = heapq.heappop(Q)
+        node = g.nodelist[u]
 
-            # Check if previous top node stayed on top after the sort
-            check = Q[0][0] == current
+        if stamp == len(selected):
+            selected.append(node)
+        else:
+            heapq.heappush(Q, (-spread.gain(selected, node), u, len(selected)))
 
-        # Select the next node
-        selected.append(Q[0][0])
-        spread += Q[0][1]  # Update the spread
-        last_seed = Q[0][0]  # Update the last added seed
+    print(selected)
+    return selected
 
-        # Remove the selected node from the list
-        Q = Q[1:]
+def celfpp(g, config, budget, rounds=100, model='SI', beta=0.1, random_state=None, crn=False):
+    """
+    CELF++ on a lazy-forward heap. Besides mg1 = gain w.r.t. S, every node
+    keeps mg2 = gain w.r.t. S + prev_best, where prev_best was the best node
+    of the iteration when mg1 was computed. If prev_best becomes the next
+    seed, mg2 is the new mg1 without another simulation.
+    crn=True evaluates every gain on the same sampled worlds.
+    """
+    g = compile_graph(g, config)
+    if crn:
+        spread = Worlds(g, model, rounds, beta=beta, random_state=random_state)
+    else:
+        spread = engine.SpreadCache(g, model, rounds, beta=beta, key=engine.entropy(random_state))
+
+    prev_best, mg2 = {}, {}
+    cur_best, best_gain = None, -np.inf
+
+    def evaluate(u, selected):
+        # mg1 w.r.t. selected and mg2 w.r.t. selected + cur_best
+        node = g.nodelist[u]
+        mg1 = spread.gain(selected, node)
+        prev_best[u] = cur_best
+        if cur_best is not None and cur_best != node:
+            mg2[u] = spread.gain(selected + [cur_best], node)
+        return mg1
+
+    Q = []
+    for node in g.nodes():
+        u = g.index[node]
+        mg1 = evaluate(u, [])
+        Q.append((-mg1, u, 0))
+        if mg1 > best_gain:
+            cur_best, best_gain = node, mg1
+    heapq.heapify(Q)
+
+    selected, last_seed = [], None
+    while len(selected) < budget and Q:
+        gain, u, stamp = heapq.heappop(Q)
+        node = g.nodelist[u]
+
+        if stamp == len(selected):
+            selected.append(node)
+            last_seed = node
+            cur_best, best_gain = None, -np.inf
+            continue
+
+        if prev_best[u] == last_seed and stamp == len(selected) - 1 and u in mg2:
+            mg1 = mg2.pop(u)
+        else:
+            mg1 = evaluate(u, selected)
+
+        heapq.heappush(Q, (-mg1, u, len(selected)))
+        if mg1 > best_gain:
+            cur_best, best_gain = node, mg1
 
     print(selected)
     return selected
@@ -169,321 +135,348 @@ def celfpp(g, config, budget, rounds=100, model='SI', beta=0.1):
 # baselines: proxy based
 # eigen centrality 
 def eigen(g, config, budget):
+    g = compile_graph(g, config)
 
-    g_eig = g.__class__()
-    g_eig.add_nodes_from(g)
-    g_eig.add_edges_from(g.edges)
-    for a, b in g_eig.edges():
-        weight = config.config["edges"]['threshold'][(a, b)]
-        g_eig[a][b]['weight'] = weight
+    # removed nodes are masked out of the adjacency instead of copying the graph,
+    # the centrality is unweighted as with nx.eigenvector_centrality_numpy
+    A = g.to_scipy(weighted=False).T.tocsr()
+    alive = np.ones(g.n)
+    M = sla.LinearOperator(A.shape, matvec=lambda x: alive * (A @ (alive * x.ravel())), dtype=float)
 
     eig = []
+    vec = np.ones(g.n)
 
     for k in range(budget):
 
-        eigen = nx.eigenvector_centrality_numpy(g_eig)
-        selected = sorted(eigen, key=eigen.get, reverse=True)[0]
+        # ARPACK warm started from the previous eigenvector
+        v0 = vec if np.any(vec) else alive.copy()
+        if g.directed:
+            _, vec = sla.eigs(M, k=1, which='LR', v0=v0)
+        else:
+            _, vec = sla.eigsh(M, k=1, which='LA', v0=v0)
+        vec = vec.ravel().real
+        vec = vec * np.sign(vec.sum())
+        eigen = np.where(alive > 0, vec, -np.inf)
+
+        selected = int(np.argmax(eigen))
         eig.append(selected)
-        g_eig.remove_node(selected)
+        alive[selected] = 0
+        vec[selected] = 0
 
+    eig = g.labels(eig)
     print(eig)
     return eig
 
 # degree
 def degree(g, config, budget):
-    g_deg = g.__class__()
-    g_deg.add_nodes_from(g)
-    g_deg.add_edges_from(g.edges)
-    for a, b in g_deg.edges():
-        weight = config.config["edges"]['threshold'][(a, b)]
-        g_deg[a][b]['weight'] = weight
+    g = compile_graph(g, config)
 
-    deg = []
+    # degree in the remaining graph, decremented as nodes are removed
+    deg = g.out_degree() + g.in_degree() if g.directed else g.out_degree()
+    deg = deg.astype(float)
+
+    result = []
 
     for k in range(budget):
-        degree = nx.centrality.degree_centrality(g_deg)
-        selected = sorted(degree, key=degree.get, reverse=True)[0]
-        deg.append(selected)
-        g_deg.remove_node(selected)
+        selected = int(np.argmax(deg))
+        result.append(selected)
 
-    print(deg)
-    return deg
+        deg[selected] = -np.inf
+        np.subtract.at(deg, g.indices[g.indptr[selected]:g.indptr[selected + 1]], 1)
+        if g.directed:
+            np.subtract.at(deg, g.rindices[g.rindptr[selected]:g.rindptr[selected + 1]], 1)
 
-# pi
-def pi(g, config, budget):
-    g_greedy = g.__class__()
-    g_greedy.add_nodes_from(g)
-    g_greedy.add_edges_from(g.edges)
+    result = g.labels(result)
+    print(result)
+    return result
 
-    for a, b in g_greedy.edges():
-        weight = config.config["edges"]['threshold'][(a, b)]
-        g_greedy[a][b]['weight'] = weight
+def _greedy_edge_score(g, budget, edge_score):
+    # pick the node with the largest sum of edge_score over its out-edges in
+    # the remaining graph; removing a node only changes its in-neighbours
+    score = np.add.reduceat(np.append(edge_score(g.weights), 0), g.indptr[:-1]) * (np.diff(g.indptr) > 0)
+    rscore = edge_score(g.rweights)
 
     result = []
 
     for k in range(budget):
+        selected = int(np.argmax(score))
+        result.append(selected)
 
-        n = g_greedy.number_of_nodes()
-
-        I = np.ones((n, 1))
+        start, end = g.rindptr[selected], g.rindptr[selected + 1]
+        np.subtract.at(score, g.rindices[start:end], rscore[start:end])
+        score[selected] = -np.inf
 
-        C = np.ones((n, n))
-        N = np.ones((n, n))
+    return result
 
-        A = nx.convert_matrix.to_numpy_array(g_greedy, nodelist=list(g_greedy.nodes()))
+# pi
+def pi(g, config, budget):
+    g = compile_graph(g, config)
 
+    # row sums of 1 - prod_i (1 - A^i) over i = 1..5, element-wise powers
+    def edge_score(w):
+        N = np.ones_like(w)
         for i in range(5):
-            B = np.power(A, i + 1)
-            D = C - B
-            N = np.multiply(N, D)
-
-        P = C - N
+            N = N * (1 - np.power(w, i + 1))
+        return 1 - N
 
-        pi = np.matmul(P, I)
-
-        value = {}
-
-        for i in range(n):
-            value[list(g_greedy.nodes())[i]] = pi[i, 0]
-
-        selected = sorted(value, key=value.get, reverse=True)[0]
-
-        result.append(selected)
-
-        g_greedy.remove_node(selected)
+    result = _greedy_edge_score(g, budget, edge_score)
 
+    result = g.labels(result)
     print(result)
     return result
 
 # sigma
 def sigma(g, config, budget):
-    g_greedy = g.__class__()
-    g_greedy.add_nodes_from(g)
-    g_greedy.add_edges_from(g.edges)
+    g = compile_graph(g, config)
 
-    for a, b in g_greedy.edges():
-        weight = config.config["edges"]['threshold'][(a, b)]
-        g_greedy[a][b]['weight'] = weight
+    # sigma = (I + A^5) ... (I + A^2) (I + A) 1 with element-wise powers A^i,
+    # as sparse mat-vecs over the adjacency masked to the remaining nodes
+    A = g.to_scipy()
+    powers = [A.power(i + 1) for i in range(5)]
+    alive = np.ones(g.n)
 
     result = []
 
     for k in range(budget):
 
-        n = g_greedy.number_of_nodes()
-
-        I = np.ones((n, 1))
-
-        F = np.ones((n, n))
-        N = np.ones((n, n))
-
-        A = nx.convert_matrix.to_numpy_array(g, nodelist=g_greedy.nodes())
+        sigma = np.ones(g.n)
+        for B in powers:
+            sigma = sigma + alive * (B @ (alive * sigma))
 
-        sigma = I
-        for i in range(5):
-            B = np.power(A, i + 1)
-            C = np.matmul(B, I)
-            sigma += C
-
-        value = {}
-
-        for i in range(n):
-            value[list(g_greedy.nodes())[i]] = sigma[i, 0]
+        sigma[alive == 0] = -np.inf
 
-        selected = sorted(value, key=value.get, reverse=True)[0]
+        selected = int(np.argmax(sigma))
 
         result.append(selected)
 
-        g_greedy.remove_node(selected)
+        alive[selected] = 0
 
+    result = g.labels(result)
     print(result)
     return result
 
 def Netshield(g, config, budget):
+    g = compile_graph(g, config)
 
-    g_greedy = g.__class__()
-    g_greedy.add_nodes_from(g)
-    g_greedy.add_edges_from(g.edges)
-
-    for a, b in g_greedy.edges():
-        weight = config.config["edges"]['threshold'][(a, b)]
-        g_greedy[a][b]['weight'] = weight
-
-    A = nx.adjacency_matrix(g_greedy)
+    # leading eigenpair by ARPACK, directed graphs use the symmetric part
+    A = g.to_scipy()
+    if g.directed:
+        A = ((A + A.T) / 2).tocsr()
+    lam, u = sla.eigsh(A, k=1, which='LA')
+    lam = lam[0]
 
-    lam, u = np.linalg.eigh(A.toarray())
-    lam = list(lam)
-    lam = lam[-1]
-
-    u = u[:, -1]
-
-    u = np.abs(np.real(u).flatten())
-    v = (2 * lam * np.ones(len(u))) * np.power(u, 2)
+    u = np.abs(u[:, 0])
+    v = 2 * lam * np.power(u, 2)
 
+    # b = A[:, nodes] @ u[nodes], updated with one column per selection
+    b = np.zeros(g.n)
     nodes = []
     for i in range(budget):
-        B = A[:, nodes]
-        b = B * u[nodes]
-
         score = v - 2 * b * u
         score[nodes] = -1
 
-        nodes.append(np.argmax(score))
+        selected = int(np.argmax(score))
+        nodes.append(selected)
+        column = A[:, [selected]].tocoo()
+        np.add.at(b, column.row, column.data * u[selected])
 
+    nodes = g.labels(nodes)
     print(nodes)
     return nodes
 
 # IMRank
 # https://github.com/Braylon1002/IMTool
-def IMRank(g, config, budget):
+def IMRank(g, config, budget, max_iter=100, return_changes=False):
     """
     IMRank algorithm to rank the nodes based on their influence.
+    The ranking is refined by LFA until it stops changing or max_iter
+    iterations ran. With return_changes, also returns the number of
+    nodes whose rank changed in each iteration.
     """
 
-    # Obtain adjacency matrix from the graph
-    adjacency_matrix = nx.adjacency_matrix(g).todense()
+    g = compile_graph(g, config)
 
-    # Normalize the adjacency matrix
-    row_sums = adjacency_matrix.sum(axis=1)
-    
-    # Check for zero entries in row_sums (which could correspond to isolated nodes)
-    # and replace them with 1 to prevent division by zero errors
+    # Normalize the adjacency matrix; isolated nodes keep zero rows
+    A = g.to_scipy()
+    row_sums = A.sum(axis=1)
     row_sums[row_sums == 0] = 1
+    A = sp.csr_array(sp.diags(1 / row_sums) @ A)
 
-    adjacency_matrix = adjacency_matrix / row_sums
-    
-    start = time.perf_counter()
-    t = 0
-    r0 = [i for i in range(len(adjacency_matrix))]
-    r = [0 for i in range(len(adjacency_matrix))]
+    r0 = np.arange(g.n)
+    changes = []
 
     # Loop until the ranks converge
-    while True:
-        t = t + 1
-        r = LFA(adjacency_matrix)
-        r = np.argsort(-np.array(r))
-        if operator.eq(list(r0), list(r)):
+    for t in range(max_iter):
+        r = np.argsort(-LFA(A, r0), kind='stable')
+        changes.append(int(np.count_nonzero(r != r0)))
+        r0 = r
+        if changes[-1] == 0:
             break
-        r0 = copy.copy(r)
-        
+
     # Select top nodes up to the budget
-    selected = r[:budget].tolist()
+    selected = g.labels(r0[:budget].tolist())
 
     print(selected)
+    if return_changes:
+        return selected, changes
     return selected
 
 # baselines: sketch based
 
 #RIS
 # https://github.com/Braylon1002/IMTool
-def RIS(g, config, budget, rounds=100):
-#     mc = 100
+def RIS(g, config, budget, rounds=100, random_state=None):
+    """
+    rounds RR sets are sampled in batches by a vectorized reverse BFS and
+    the seeds are picked by greedy maximum coverage over them.
+    """
+    g = compile_graph(g, config)
+
     # Generate mc RRSs
-    R = [get_RRS(g, config) for _ in range(rounds)]
+    offsets, members = rrset.sample(g, rounds, random_state=random_state)
 
-    selected = []
-    for _ in range(budget):
-        # Collect all nodes from all RRSs
-        flat_map = [item for subset in R for item in subset]
-        # Only proceed if there are nodes in the flat_map
-        if flat_map:
-            seed = Counter(flat_map).most_common()[0][0]
-            selected.append(seed)
+    selected, _ = rrset.max_coverage(offsets, members, g.n, budget)
+    selected = g.labels(selected)
 
-            R = [rrs for rrs in R if seed not in rrs]
+    print(selected)
+    return (selected)
+
+def _check_sketch_model(model):
+    # RR sets of 'LT' follow classic weighted LT, while LT() and the engine
+    # run ndlib's ThresholdModel (fixed thresholds against the active
+    # fraction of the neighbours), whose spread has no RR-set form, so the
+    # guarantees of IMM and OPIM-C would not hold for it
+    if model == 'LT':
+        raise ValueError("IMM and OPIM_C support model='IC' or 'SI', not the ndlib threshold model 'LT'")
+
+# IMM
+# https://dl.acm.org/doi/10.1145/2723372.2723734
+def IMM(g, config, budget, model='IC', steps=4, beta=0.1, epsilon=0.1, l=1, random_state=None):
+    """
+    Influence Maximization via Martingales: the seeds are a
+    (1 - 1/e - epsilon)-approximation with probability at least 1 - 1/n^l.
+    RR sets follow model for steps diffusion steps, like the simulations.
+    model='LT' raises ValueError, see _check_sketch_model.
+    """
+    _check_sketch_model(model)
+    g = compile_graph(g, config)
+    rng = engine.check_random_state(random_state)
+    n, k = g.n, min(budget, g.n)
+    if k == n or k == 0:
+        # every node or none, the bounds below need 0 < k < n
+        selected = g.labels(range(k))
+        print(selected)
+        return selected
+    l = l * (1 + np.log(2) / np.log(n))
+    log_binom = math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+
+    # sampling: estimate a lower bound LB of the optimal spread
+    eps_prime = np.sqrt(2) * epsilon
+    lambda_prime = (2 + 2 / 3 * eps_prime) * (log_binom + l * np.log(n) + np.log(np.log2(n))) * n / eps_prime ** 2
+    parts, size = [], 0
+    LB = 1
+    for i in range(1, int(np.log2(n))):
+        x = n / 2 ** i
+        theta = int(np.ceil(lambda_prime / x))
+        parts.append(rrset.sample(g, max(theta - size, 0), model, steps, beta, rng))
+        size = max(theta, size)
+        offsets, members = rrset.join(parts)
+        _, covered = rrset.max_coverage(offsets, members, n, k)
+        if n * covered / size >= (1 + eps_prime) * x:
+            LB = n * covered / size / (1 + eps_prime)
+            break
 
-            # For every removed RRS, generate a new one
-            while len(R) < rounds:
-                R.append(get_RRS(g, config))
+    # node selection on fresh RR sets, so the estimate is independent of LB
+    alpha = np.sqrt(l * np.log(n) + np.log(2))
+    beta_ = np.sqrt((1 - 1 / np.e) * (log_binom + l * np.log(n) + np.log(2)))
+    lambda_star = 2 * n * ((1 - 1 / np.e) * alpha + beta_) ** 2 / epsilon ** 2
+    theta = int(np.ceil(lambda_star / LB))
+    offsets, members = rrset.sample(g, theta, model, steps, beta, rng)
+
+    selected, _ = rrset.max_coverage(offsets, members, n, k)
+    selected = g.labels(selected)
 
     print(selected)
-    return (selected)
+    return selected
+
+# OPIM-C
+# https://dl.acm.org/doi/10.1145/3183713.3183749
+def OPIM_C(g, config, budget, model='IC', steps=4, beta=0.1, epsilon=0.1, delta=None, random_state=None):
+    """
+    Online processing IM: doubles two independent collections of RR sets
+    until the seeds picked on the first are certified, by the second, to be
+    a (1 - 1/e - epsilon)-approximation with probability at least 1 - delta
+    (default 1/n). model='LT' raises ValueError, as in IMM.
+    """
+    _check_sketch_model(model)
+    g = compile_graph(g, config)
+    rng = engine.check_random_state(random_state)
+    n, k = g.n, min(budget, g.n)
+    if k == n or k == 0:
+        # every node or none, the bounds below need 0 < k < n
+        selected = g.labels(range(k))
+        print(selected)
+        return selected
+    delta = 1 / n if delta is None else delta
+    log_binom = math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+
+    approx = 1 - 1 / np.e
+    theta_max = 2 * n * (approx * np.sqrt(np.log(6 / delta))
+                         + np.sqrt(approx * (log_binom + np.log(6 / delta)))) ** 2 / (epsilon ** 2 * k)
+    theta = int(np.ceil(theta_max * epsilon ** 2 * k / n))
+    i_max = max(1, int(np.ceil(np.log2(theta_max / theta))))
+    a = np.log(3 * i_max / delta)
+
+    R1 = rrset.sample(g, theta, model, steps, beta, rng)
+    R2 = rrset.sample(g, theta, model, steps, beta, rng)
+    for i in range(i_max):
+        selected, _, upper = rrset.max_coverage(*R1, n, k, return_bound=True)
+        covered = rrset.coverage(*R2, n, selected)
+
+        lower = ((np.sqrt(covered + 2 * a / 9) - np.sqrt(a / 2)) ** 2 - a / 18) * n / theta
+        upper = (np.sqrt(upper + a / 2) + np.sqrt(a / 2)) ** 2 * n / theta
+        # the last round is not certified either, no more samples are used
+        if lower / upper >= approx - epsilon or i == i_max - 1:
+            break
+        R1 = rrset.join([R1, rrset.sample(g, theta, model, steps, beta, rng)])
+        R2 = rrset.join([R2, rrset.sample(g, theta, model, steps, beta, rng)])
+        theta *= 2
 
-# def IMM(g, config, budget, rounds=100, model='SI', beta=0.1):
-#     l = 1
-#     epsilon = 0.1
-#     l = l * (1 + np.log(2) / np.log(len(g.nodes()))) # Update l
-#     k = budget
-    
-#     R = Sampling(g, config, epsilon, l, model, rounds, beta)
-    
-#     S = NodeSelection(R, k)
-#     print(S)
-#     return S
-
-# def Sampling(g, config, epsilon, l, model='SI', rounds=100, beta=0.1):
-#     R = []
-#     n = len(g.nodes())
-#     LB = 1
-#     eps_prime = np.sqrt(2) * epsilon
-#     for i in range(1, int(np.log2(n))):
-#         x = n / (2 ** i)
-#         theta_i = (l / eps_prime ** 2) * np.log(n) / x
-#         while len(R) <= theta_i:
-#             v = random.choice(list(g.nodes()))
-#             R.append(get_RRS(g, config))
-#         S_i = NodeSelection(R, int(x))  # Changed budget to int(x) here
-#         if n * len(S_i) >= (1 + eps_prime) * x:  
-#             LB = n * len(S_i) / (1 + eps_prime)
-#             break
-#     theta = (l / (epsilon ** 2)) * np.log(n) / LB
-#     while len(R) <= theta:
-#         v = random.choice(list(g.nodes()))
-#         R.append(get_RRS(g, config))
-#     return R
-
-# def NodeSelection(R, k):
-#     S = []
-#     RR_sets_covered = set()
-#     for _ in range(k):
-#         max_spread = 0
-#         best_node = None
-#         for v in set().union(*R):  
-#             if v not in S:
-#                 RR_sets_can_cover = sum([v in RR for RR in R if tuple(RR) not in RR_sets_covered])
-#                 if RR_sets_can_cover > max_spread:
-#                     max_spread = RR_sets_can_cover
-#                     best_node = v
-#         if best_node is not None:
-#             S.append(best_node)
-#             RR_sets_covered |= set([tuple(RR) for RR in R if best_node in RR])
-#         else:
-#             print("No suitable node found!")
-#     return S
-
-
-# updates to the Mr vector occur simultaneously:
-def LFA(matrix):
+    selected = g.labels(selected)
+
+    print(selected)
+    return selected
+
+
+def LFA(A, rank):
     """
-    Linear Feedback Algorithm to update the ranks of the nodes.
+    Linear Feedback Algorithm: ranking-based marginal influence of every node.
+    Going up the ranking, each node hands its score to its higher ranked
+    in-neighbours, weighted by A, and keeps the part none of them takes.
+    The scores handed up solve the triangular system (I - U) x = 1, with U
+    the part of A above the diagonal in rank order.
     """
-    n = len(matrix)
-    Mr = [1 for _ in range(n)]
-    Mr_next = Mr.copy()
-    for i_ in range(1, n):
-        i = n - i_
-        for j in range(0, i + 1):
-            Mr_next[j] = Mr_next[j] + matrix[j][i] * Mr[i]
-            Mr_next[i] = (1 - matrix[j][i]) * Mr_next[i]
-        Mr = Mr_next.copy()
+    n = A.shape[0]
+    P = sp.csr_array(A[rank][:, rank])
+    U = sp.triu(P, k=1, format='csr')
+    x = sla.spsolve_triangular(sp.eye_array(n, format='csr') - U, np.ones(n), lower=False)
+
+    # retention: product of (1 - p) over the higher ranked in-neighbours
+    U = U.tocoo()
+    with np.errstate(divide='ignore'):
+        keep = np.exp(np.bincount(U.col, weights=np.log1p(-np.minimum(U.data, 1)), minlength=n))
+
+    Mr = np.empty(n)
+    Mr[rank] = x * keep
     return Mr
 
 
 def get_RRS(g, config):
     """
-    Inputs: g: Network graph
+    Inputs: g: Network graph or CompiledGraph
             config: Configuration object for the IC model
     Outputs: A random reverse reachable set expressed as a list of nodes
     """
-    # get edges according to the propagation probability
-    edges = [(u, v) for (u, v, d) in g.edges(data=True) if uniform(0, 1) < config.config["edges"]['threshold'][(u, v)]]
-    
-    # create a subgraph based on the edges
-    g_sub = g.edge_subgraph(edges)
-    
-    # select a random node as the starting point that is part of the subgraph
-    source = random.choice(list(g_sub.nodes()))
-    
-    # perform a depth-first traversal from the source node to get the RRS
-    RRS = list(nx.dfs_preorder_nodes(g_sub, source))
-    return RRS
-
+    g = compile_graph(g, config)
+    offsets, members = rrset.sample(g, 1)
+    return g.labels(members.tolist())
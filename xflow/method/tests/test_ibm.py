@@ -0,0 +1,26 @@
+import networkx as nx
+import ndlib.models.ModelConfig as mc
+
+import xflow.method.ibm as ibm
+
+
+def test_greedy_blocks_bridge():
+    # both seeds reach the hub 3 and its leaves only through node 2
+    g = nx.Graph([(0, 2), (1, 2), (2, 3)])
+    g.add_edges_from((3, v) for v in range(4, 12))
+    config = mc.Configuration()
+    for a, b in g.edges():
+        config.add_edge_configuration("threshold", (a, b), 1.0)
+    for model in ['IC', 'LT', 'SI']:
+        assert ibm.greedy(g, config, 1, [0, 1], rounds=10, model=model, beta=1.0, random_state=0) == [2]
+    assert ibm.greedy(g, config, 2, [0, 1], rounds=10, model='IC', random_state=0)[0] == 2
+
+
+def test_greedy_crn():
+    g = nx.Graph([(0, 2), (1, 2), (2, 3)])
+    g.add_edges_from((3, v) for v in range(4, 12))
+    config = mc.Configuration()
+    for a, b in g.edges():
+        config.add_edge_configuration("threshold", (a, b), 0.8)
+    for model in ['IC', 'LT', 'SI']:
+        assert ibm.greedy(g, config, 1, [0, 1], rounds=20, model=model, beta=0.8, random_state=0, crn=True) == [2]
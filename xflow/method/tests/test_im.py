@@ -0,0 +1,129 @@
+import random
+import networkx as nx
+import numpy as np
+import pytest
+import scipy.sparse as sp
+import ndlib.models.ModelConfig as mc
+
+import xflow.method.im as im
+from xflow.compiled import compile_graph
+
+
+def star_forest(weight=1.0):
+    # two disjoint stars of different size, hubs are 0 and 10
+    g = nx.star_graph(8)
+    g.add_edges_from((10, v) for v in range(11, 15))
+    config = mc.Configuration()
+    for a, b in g.edges():
+        g[a][b]['weight'] = weight
+        config.add_edge_configuration("threshold", (a, b), weight)
+    return g, config
+
+
+def test_greedy_picks_hubs():
+    g, config = star_forest()
+    assert im.greedy(g, config, 2, rounds=10, model='IC', random_state=0) == [0, 10]
+
+
+def test_greedy_workers_reproducible():
+    g, config = star_forest(0.3)
+    cg = compile_graph(g, config)
+    serial = im.greedy(cg, None, 3, rounds=30, model='SI', random_state=3)
+    parallel = im.greedy(cg, None, 3, rounds=30, model='SI', random_state=3, workers=2)
+    assert serial == parallel
+
+
+def test_celf_matches_greedy():
+    g, config = star_forest(0.4)
+    cg = compile_graph(g, config)
+    expected = im.greedy(cg, None, 2, rounds=50, model='IC', random_state=1)
+    assert expected == [0, 10]
+    assert im.celf(cg, None, 2, rounds=50, model='IC', random_state=1) == expected
+    assert im.celfpp(cg, None, 2, rounds=50, model='IC', random_state=1) == expected
+
+
+def test_imm_and_opim_pick_hubs():
+    g, config = star_forest()
+    for model in ['IC', 'SI']:
+        assert sorted(im.IMM(g, config, 2, model=model, epsilon=0.5, random_state=0)) == [0, 10]
+        assert sorted(im.OPIM_C(g, config, 2, model=model, epsilon=0.5, random_state=0)) == [0, 10]
+    # trivial budgets need no sampling
+    single = nx.Graph()
+    single.add_node('a')
+    for method in (im.IMM, im.OPIM_C):
+        assert method(single, None, 1) == ['a']
+        assert sorted(method(g, config, 20)) == sorted(g.nodes())
+        assert method(g, config, 0) == []
+    # RR sets cannot follow the ndlib threshold model of LT()
+    with pytest.raises(ValueError):
+        im.IMM(g, config, 2, model='LT')
+    with pytest.raises(ValueError):
+        im.OPIM_C(g, config, 2, model='LT')
+
+
+def test_opim_stops_sampling_after_last_round(monkeypatch):
+    # with the bound never met, every round fails; no RR sets may be drawn
+    # after the last round's check
+    events = []
+    sample, max_coverage = im.rrset.sample, im.rrset.max_coverage
+    monkeypatch.setattr(im.rrset, 'coverage', lambda *args: 0)
+    monkeypatch.setattr(im.rrset, 'sample', lambda *args: events.append('sample') or sample(*args))
+    monkeypatch.setattr(im.rrset, 'max_coverage',
+                        lambda *args, **kw: events.append('check') or max_coverage(*args, **kw))
+    g, config = star_forest(0.5)
+    im.OPIM_C(g, config, 2, epsilon=0.5, random_state=0)
+    assert events[-1] == 'check'
+    assert events.count('sample') == 2 * events.count('check')
+
+
+def test_sparse_proxies_match_dense():
+    g = nx.gnp_random_graph(40, 0.1, seed=2, directed=True)
+    rng = np.random.default_rng(0)
+    for a, b in g.edges():
+        g[a][b]['weight'] = rng.random()
+    A = nx.to_numpy_array(g)
+
+    P = 1 - np.prod([1 - np.power(A, i + 1) for i in range(5)], axis=0)
+    assert im.pi(g, None, 1) == [int(np.argmax(P.sum(axis=1)))]
+
+    sigma = np.ones(40)
+    for i in range(5):
+        sigma = sigma + np.power(A, i + 1) @ sigma
+    assert im.sigma(g, None, 1) == [int(np.argmax(sigma))]
+
+    lam, u = np.linalg.eigh(nx.to_numpy_array(g.to_undirected()))
+    assert im.Netshield(g.to_undirected(), None, 1) == [int(np.argmax(np.abs(u[:, -1])))]
+
+
+def test_lfa_matches_sequential_updates():
+    g = nx.gnp_random_graph(30, 0.15, seed=1, directed=True)
+    A = nx.to_numpy_array(g)
+    A = A / np.maximum(A.sum(axis=1, keepdims=True), 1)
+    rank = np.random.default_rng(0).permutation(30)
+
+    # the original LFA loop, walking the ranking from the bottom
+    Mr = np.ones(30)
+    for i in range(29, 0, -1):
+        v, Mr_next = rank[i], Mr.copy()
+        for u in rank[:i]:
+            Mr_next[u] += A[u, v] * Mr[v]
+            Mr_next[v] *= 1 - A[u, v]
+        Mr = Mr_next
+    assert np.allclose(im.LFA(sp.csr_array(A), rank), Mr)
+
+
+def test_imrank_converges():
+    g, config = star_forest(0.5)
+    selected, changes = im.IMRank(g, config, 2, return_changes=True)
+    assert selected == [0, 10]
+    assert changes[-1] == 0
+    assert len(im.IMRank(g, config, 2, max_iter=1, return_changes=True)[1]) == 1
+
+
+def test_crn_mode():
+    g, config = star_forest(0.4)
+    cg = compile_graph(g, config)
+    for model in ['IC', 'LT', 'SI']:
+        assert im.greedy(cg, None, 2, rounds=20, model=model, random_state=0, crn=True) == [0, 10]
+    assert im.celf(cg, None, 2, rounds=20, model='IC', random_state=0, crn=True) == [0, 10]
+    assert im.celfpp(cg, None, 2, rounds=20, model='SI', random_state=0, crn=True) == [0, 10]
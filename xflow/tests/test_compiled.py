@@ -0,0 +1,78 @@
+import networkx as nx
+import numpy as np
+import ndlib.models.ModelConfig as mc
+
+from xflow.compiled import CompiledGraph, compile_graph
+
+
+def weighted(g, weight):
+    config = mc.Configuration()
+    for a, b in g.edges():
+        g[a][b]['weight'] = weight
+        config.add_edge_configuration("threshold", (a, b), weight)
+    return g, config
+
+
+def test_compile_undirected():
+    g, config = weighted(nx.path_graph(4), 0.5)
+    cg = compile_graph(g, config)
+    assert cg.indptr.tolist() == [0, 1, 3, 5, 6]
+    assert sorted(cg.indices[cg.indptr[1]:cg.indptr[2]].tolist()) == [0, 2]
+    assert np.allclose(cg.weights, 0.5)
+    assert cg.number_of_edges() == 3
+    assert compile_graph(cg) is cg
+
+
+def test_compile_directed():
+    g, config = weighted(nx.DiGraph([(0, 1), (1, 2)]), 0.3)
+    cg = compile_graph(g, config)
+    assert cg.indptr.tolist() == [0, 1, 2, 2]
+    assert cg.indices.tolist() == [1, 2]
+    # reverse adjacency
+    assert cg.rindptr.tolist() == [0, 0, 1, 2]
+    assert cg.rindices.tolist() == [0, 1]
+    assert cg.in_degree().tolist() == [0, 1, 1]
+
+
+def test_edge_attributes_without_config():
+    g = nx.Graph()
+    g.add_edge('a', 'b', weight=0.25)
+    cg = CompiledGraph.from_networkx(g)
+    assert cg.nodes() == ['a', 'b']
+    assert cg.weights.tolist() == [0.25, 0.25]
+
+
+def test_to_scipy_matches_networkx():
+    g, config = weighted(nx.karate_club_graph(), 0.4)
+    A = compile_graph(g, config).to_scipy()
+    assert np.allclose(A.toarray(), nx.to_numpy_array(g))
+
+
+def test_to_scipy_does_not_share_arrays():
+    g, config = weighted(nx.gnp_random_graph(30, 0.2, seed=0), 0.5)
+    cg = compile_graph(g, config)
+    weights, indices = cg.weights.copy(), cg.indices.copy()
+    A = cg.to_scipy()
+    A.sort_indices()
+    A.data *= 2
+    assert np.array_equal(cg.weights, weights)
+    assert np.array_equal(cg.indices, indices)
+
+
+def test_subgraph():
+    g, config = weighted(nx.path_graph(5), 0.5)
+    cg = compile_graph(g, config)
+    sub = cg.subgraph(np.array([True, True, False, True, True]))
+    assert sub.nodes() == [0, 1, 3, 4]
+    assert sub.number_of_edges() == 2
+    assert sub.labels(sub.indices[sub.indptr[2]:sub.indptr[3]]) == [4]
+
+
+def test_save_load(tmp_path):
+    g, config = weighted(nx.relabel_nodes(nx.path_graph(5), {0: 'a'}), 0.4)
+    cg = compile_graph(g, config)
+    cg.save(str(tmp_path / 'g'))
+    loaded = CompiledGraph.load(str(tmp_path / 'g'))
+    assert loaded.nodelist == cg.nodelist and loaded.index['a'] == 0
+    assert isinstance(loaded.rindices, np.memmap)
+    assert np.array_equal(loaded.rweights, cg.rweights) and loaded.number_of_edges() == 4
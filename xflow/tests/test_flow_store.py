@@ -0,0 +1,65 @@
+import gc
+import weakref
+import numpy as np
+import networkx as nx
+import pytest
+
+from xflow.flow_tasks import forward
+from xflow.flow_store import FlowStore, FlowWriter, write
+
+
+def test_store_round_trip(tmp_path):
+    samples = forward([1, 2], num_results=5, graph_size=60, interval_lower=0, seed=4)
+    store = write(samples, tmp_path / 'store', chunk_size=2)
+
+    assert len(store) == 5 and len(store.chunks) == 3
+    assert store.states(0).dtype == np.int8
+    for i, sample in enumerate(samples):
+        item = store[i]
+        assert [obs['time'] for obs in item['observations']] == [obs['time'] for obs in sample['observations']]
+        for a, b in zip(item['observations'], sample['observations']):
+            assert np.array_equal(a['observation'], b['observation'])
+        assert item['beta'] == sample['SIR_config'].config['model']['beta']
+
+    # every sample has its own graph here, each written once
+    assert store.num_graphs == 5
+    cg = store.graph(2)
+    assert cg.n == 60 and len(cg.indices) == 2 * samples[2]['base_graph'].number_of_edges()
+
+
+def test_store_batches_and_reopen(tmp_path):
+    store = forward(1, num_results=5, graph_size=40, interval_lower=0, seed=1,
+                    path=tmp_path / 'store', chunk_size=2)
+    assert isinstance(store, FlowStore)
+
+    reopened = FlowStore(tmp_path / 'store')
+    seen = []
+    for idx, states in reopened.batches(batch_size=3, shuffle=True, random_state=0):
+        assert states.shape == (len(idx), 2, 40)
+        assert np.array_equal(states, store.states(idx))
+        seen.extend(idx)
+    assert sorted(seen) == list(range(5))
+
+
+def test_store_needs_numpy_observations(tmp_path):
+    samples = forward(1, num_results=1, graph_size=30, interval_lower=0, obs_type='networkx', seed=0)
+    with pytest.raises(ValueError):
+        write(samples, tmp_path / 'store')
+
+
+def test_writer_drops_written_graphs(tmp_path):
+    sample = forward(1, num_results=1, graph_size=30, interval_lower=0, seed=2)[0]
+    refs = []
+    with FlowWriter(tmp_path / 'store') as writer:
+        for _ in range(3):
+            g = nx.Graph(sample['base_graph'])
+            refs.append(weakref.ref(g))
+            writer.append(dict(sample, base_graph=g))
+            # consecutive samples of one graph store it once
+            writer.append(dict(sample, base_graph=g))
+            del g
+        gc.collect()
+        assert [ref() is None for ref in refs] == [True, True, False]
+    gc.collect()
+    assert refs[-1]() is None
+    assert FlowStore(tmp_path / 'store').meta['graph'].tolist() == [0, 0, 1, 1, 2, 2]
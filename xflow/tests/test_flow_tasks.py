@@ -0,0 +1,111 @@
+import types
+import pytest
+import numpy as np
+import networkx as nx
+
+from xflow.flow_tasks import forward, backward, graph_diameter, setup, run_sim, graph_eval_batch
+
+
+def states(results):
+    return [[obs['observation'] for obs in r['observations']] for r in results]
+
+
+def test_forward_seeded_samples_do_not_depend_on_workers():
+    serial = forward([1, 2], num_results=4, graph_size=60, interval_lower=0, seed=3)
+    stream = forward([1, 2], num_results=4, graph_size=60, interval_lower=0, seed=3, workers=2, batch_size=3)
+    assert isinstance(stream, types.GeneratorType)
+    stream = list(stream)
+    assert len(stream) == 4
+    for a, b in zip(states(serial), states(stream)):
+        assert all(np.array_equal(x, y) for x, y in zip(a, b))
+
+
+def test_backward_intervals():
+    results = backward(2, num_results=2, graph_size=60, interval_lower=0, batch_size=1)
+    for r in results:
+        times = [obs['time'] for obs in r['observations']]
+        assert times[0] - times[1] == 2
+
+
+def test_graph_diameter():
+    for g in (nx.path_graph(9), nx.cycle_graph(12), nx.barabasi_albert_graph(300, 2, seed=1),
+              nx.connected_watts_strogatz_graph(300, 6, 0.1, seed=2)):
+        d = nx.diameter(g)
+        assert graph_diameter(g, exact=True) == d
+        assert graph_diameter(g) <= d
+    assert graph_diameter(nx.random_labeled_tree(200, seed=0)) == nx.diameter(nx.random_labeled_tree(200, seed=0))
+
+    g = nx.path_graph(5)
+    assert graph_diameter(g) == 4
+    g.add_edge(0, 4)
+    assert graph_diameter(g) == 2
+
+
+def test_samples_per_graph():
+    results = forward([1, 2], num_results=5, graph_size=60, interval_lower=0, seed=2, samples_per_graph=3)
+    assert len(results) == 5
+    graphs = [r['base_graph'] for r in results]
+    assert all(g is graphs[0] for g in graphs[:3]) and graphs[3] is graphs[4] and graphs[3] is not graphs[0]
+    for r in results:
+        assert len(r['observations']) == 3
+        assert r['observations'][0]['observation'].shape == (60,)
+
+    stream = forward([1, 2], num_results=5, graph_size=60, interval_lower=0, seed=2, samples_per_graph=3, workers=2)
+    for a, b in zip(states(results), states(stream)):
+        assert all(np.array_equal(x, y) for x, y in zip(a, b))
+
+
+def test_torch_snapshots_share_edges():
+    results = forward([1, 2], num_results=2, graph_size=40, interval_lower=0, seed=5, obs_type='torch')
+    for r in results:
+        first, *rest = r['observations']
+        assert all(obs.edge_index is first.edge_index and obs.edge_attr is first.edge_attr for obs in rest)
+        assert first.edge_index.shape[1] == 2 * r['base_graph'].number_of_edges()
+        g = r['base_graph']
+        index = {node: i for i, node in enumerate(g.nodes())}
+        expected = {(index[u], index[v], round(w, 4)) for u, v, w in g.edges(data='weight', default=1.0)}
+        edges = {(u, v, round(w, 4)) for (u, v), w in zip(first.edge_index.T.tolist(), first.edge_attr[:, 0].tolist())}
+        assert edges == expected | {(v, u, w) for u, v, w in expected}
+        start = int(first.x[0, 1])
+        assert [int(obs.time_y) for obs in r['observations']] == [start, start + 1, start + 2]
+
+    batch = forward([1, 2], num_results=1, graph_size=40, interval_lower=0, seed=5, obs_type='torch_batch')[0]['observations']
+    assert batch.num_graphs == 3 and batch.x.shape == (120, 3)
+
+
+def test_torch_temporal_signal():
+    pytest.importorskip('torch_geometric_temporal')
+    kwargs = dict(num_results=1, graph_size=40, interval_lower=0, seed=5)
+    snapshots = forward([1, 2], obs_type='torch', **kwargs)[0]['observations']
+    signal = forward([1, 2], obs_type='torch_temporal', **kwargs)[0]['observations']
+    assert signal.snapshot_count == len(snapshots)
+    for snapshot, obs in zip(signal, snapshots):
+        assert snapshot.edge_index.tolist() == obs.edge_index.tolist()
+        assert snapshot.x.tolist() == obs.x.tolist() and snapshot.y.tolist() == obs.y.tolist()
+        assert int(snapshot.time_y) == int(obs.time_y)
+
+
+def test_run_sim_history():
+    g, model, config = setup('connSW', 80, None, 0.1, 0.05, 0.05, seed=1)
+    history = run_sim([1, 2], 1, g, model)
+    assert history.dtype == np.int8 and history.shape == (4, 80)
+    assert (history[0] == 1).sum() == 4
+    assert np.all(np.diff(history, axis=0) >= 0)
+    assert np.array_equal(history[-1], [model.status[node] for node in g.nodes()])
+
+
+def test_graph_eval_batch():
+    from sklearn.metrics import precision_recall_fscore_support, accuracy_score
+    rng = np.random.default_rng(0)
+    obs_true = rng.integers(0, 3, size=(4, 50))
+    obs_pred = rng.integers(0, 3, size=(4, 50))
+    obs_true[1][obs_true[1] == 2] = 0  # class 2 missing from one sample
+    result = graph_eval_batch(obs_true, obs_pred)
+
+    assert result.shape == (4,)
+    for i in range(4):
+        p, r, f, s = precision_recall_fscore_support(obs_true[i], obs_pred[i], labels=[0, 1, 2], zero_division=0)
+        assert np.allclose(result[i]['precision'], p) and np.allclose(result[i]['recall'], r)
+        assert np.allclose(result[i]['f1-score'], f) and np.array_equal(result[i]['support'], s)
+        assert np.isclose(result[i]['accuracy'], accuracy_score(obs_true[i], obs_pred[i]))
+    assert result['confusion'].sum() == 200
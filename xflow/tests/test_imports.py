@@ -0,0 +1,34 @@
+import os
+import sys
+import json
+import subprocess
+
+import xflow
+
+HEAVY = ['torch', 'torch_geometric', 'ndlib', 'pandas', 'matplotlib', 'sklearn']
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _import(statement):
+    # a fresh interpreter, so modules imported by other tests do not count
+    code = (f"import sys, time, json; start = time.perf_counter(); {statement}; "
+            f"print(json.dumps([time.perf_counter() - start, sorted(sys.modules)]))")
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=ROOT)
+    seconds, modules = json.loads(out.stdout.strip().splitlines()[-1])
+    return seconds, {m.split('.')[0] for m in modules}
+
+
+def test_import_is_light():
+    for statement in ['import xflow', 'from xflow.diffusion import IC', 'import xflow.dataset, xflow.method',
+                      'import xflow.method.im, xflow.method.ibm']:
+        seconds, modules = _import(statement)
+        assert not modules & set(HEAVY), statement
+        # generous bound, a regression to eager imports costs seconds
+        assert seconds < 1.5, (statement, seconds)
+
+
+def test_lazy_attributes():
+    assert xflow.diffusion.IC.__name__ == 'IC'
+    assert xflow.dataset.connSW.__module__ == 'xflow.dataset.nx'
+    assert 'dataset' in dir(xflow)
@@ -0,0 +1,71 @@
+import os
+import time
+import pytest
+import networkx as nx
+import pandas as pd
+
+from xflow import util
+from xflow.dataset import cache
+from xflow.dataset.nx import connSW
+from xflow.diffusion import IC, SI, LT
+import xflow.method.im as im
+import xflow.method.ibm as ibm
+
+
+def small():
+    return connSW(n=60, beta=0.1)
+
+
+def slow(g, config, budget):
+    time.sleep(30)
+    return []
+
+
+def test_run_records_and_resumes(tmp_path):
+    path = str(tmp_path / 'results')
+    table = util.run([small], [IC, SI], [im.degree, im.IMM], 'im', epoch=5, budget=3, seeds=[0, 1],
+                     workers=2, output=['csv'], path=path)
+    assert len(table) == 8 and set(table['status']) == {'ok'}
+    assert (table['metric'] == 'spread').all() and (table['value'] >= 3).all()
+    assert (table['wall_time'] > 0).all() and (table['peak_memory_mb'] >= 0).all()
+    assert len(pd.read_csv(path + '.csv')) == 8
+
+    # a second sweep only runs the new seed
+    table = util.run([small], [IC, SI], [im.degree, im.IMM], 'im', epoch=5, budget=3, seeds=[0, 1, 2],
+                     workers=2, output=['csv'], path=path)
+    assert len(table) == 12
+    assert len(pd.read_csv(path + '.csv')) == 12
+
+
+def test_run_blocking_and_timeout(tmp_path):
+    path = str(tmp_path / 'results')
+    table = util.run([small], [SI], [ibm.greedy, slow], 'ibm', epoch=5, budget=2, workers=2, timeout=3,
+                     output=['csv'], path=path)
+    status = dict(zip(table['method'], table['status']))
+    assert status == {'greedy': 'ok', 'slow': 'timeout'}
+    assert table.loc[table['method'] == 'greedy', 'metric'].item() == 'blocking_effect'
+
+    # rows of every status line up with the columns of the file
+    written = pd.read_csv(path + '.csv')
+    assert list(written.columns) == util.COLUMNS and written['status'].tolist() == ['ok', 'timeout']
+
+
+def test_run_writes_only_on_request(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    table = util.run([small], [SI, LT], [im.degree, im.IMM], 'im', epoch=5, budget=3)
+    assert os.listdir(tmp_path) == []
+    # IMM has no job for LT
+    assert sorted(zip(table['method'], table['diffusion'])) == [('IMM', 'SI'), ('degree', 'LT'), ('degree', 'SI')]
+    with pytest.raises(ValueError):
+        util.run([small], [SI], [im.degree], 'im', epoch=5, budget=3, output=['csv'])
+
+
+def test_run_keys_cached_graphs_by_parameters(tmp_path):
+    path = str(tmp_path / 'results')
+    graphs = [cache.cached(connSW, path=str(tmp_path), n=n, beta=0.1) for n in (40, 60)]
+    table = util.run(graphs, [SI], [im.degree], 'im', epoch=5, budget=3, output=['csv'], path=path)
+    assert len(table) == 2 and table['graph_key'].nunique() == 2
+
+    # the second graph is not taken for the first on a rerun
+    table = util.run(graphs[1:], [SI], [im.degree], 'im', epoch=5, budget=3, output=['csv'], path=path)
+    assert len(table) == 2 and len(pd.read_csv(path + '.csv')) == 2
@@ -1,71 +1,213 @@
+import os
+import time
 import random
-import xflow.method.cosasi as co
+import resource
+import traceback
+import multiprocessing
+from multiprocessing.connection import wait
 import numpy as np
+import pandas as pd
 
-# TODO make seeds changable
-# def run (graph, diffusion, seeds, method, eval, epoch, budget, output):
-def run (graph, diffusion, method, eval, epoch, budget, output):
+from xflow.compiled import compile_graph
+from xflow.diffusion import engine
 
-    print("Running " + eval.upper() + " :")
+# Experiment runner.
+#
+# run expands the (graph x method x diffusion x seed) grid into jobs and runs
+# every job in its own forked process, at most workers at a time, so a job
+# that exceeds its timeout can be killed and its peak memory is its own.
+# Each finished job is a row of the results table, written as it completes
+# when output names a file format; rows of finished jobs are read back on a
+# rerun and those jobs skipped.
+
+# key columns of a job in the results table; graph_key tells graphs of one
+# loader with different parameters apart (the key of cache.cached graphs)
+KEYS = ['eval', 'graph', 'graph_key', 'method', 'diffusion', 'seed']
+COLUMNS = KEYS + ['status', 'metric', 'value', 'selected', 'wall_time', 'peak_memory_mb', 'error']
+
+# methods taking the diffusion model, the rest are called as (g, config, budget)
+simulations = ['greedy', 'celf', 'celfpp']
+sketches = ['IMM', 'OPIM_C']
+
+
+def _name(fn):
+    return fn.__name__ if fn is not None else ''
+
+
+def _mean_spread(cg, seeds, model, epoch, seed, blocked=None):
+    return float(engine.simulate(cg, seeds, model, rounds=epoch, random_state=seed, blocked=blocked).mean())
+
+
+def _run_job(job, budget, epoch):
+    # one cell of the grid; returns the selected nodes and the metric
+    eval, graph_fn, method_fn, diffusion_fn, seed = job
+    random.seed(seed)
+    np.random.seed(seed)
+    name, model = _name(method_fn), _name(diffusion_fn)
+
+    g, config = graph_fn()
+
+    if name == 'netsleuth':
+        import xflow.method.cosasi as co
+        contagion = co.StaticNetworkContagion(G=g, model="si", infection_rate=0.1, number_infected=2, seed=seed)
+        contagion.forward(steps=16)
+        # indices of the vertices infected at the 15th step of the simulation
+        I = contagion.get_infected_subgraph(step=15)
+        sims = method_fn(I=I, G=g, hypotheses_per_step=1)
+        evals = sims.evaluate(contagion.get_source())
+        return None, 'distance', float(evals["distance"]["top score's distance"])
+
+    cg = compile_graph(g, config)
+    if eval == 'ibm':
+        seeds = random.sample(list(g.nodes()), 10)
+        if name in simulations:
+            selected = method_fn(cg, None, budget, seeds, rounds=epoch, model=model, beta=0.1, random_state=seed)
+        else:
+            selected = method_fn(cg, None, budget=budget)
+        blocked = engine.node_mask(cg, selected)
+        effect = _mean_spread(cg, seeds, model, epoch, seed) - _mean_spread(cg, seeds, model, epoch, seed, blocked)
+        return selected, 'blocking_effect', effect
+
+    if name in simulations:
+        selected = method_fn(cg, None, budget, rounds=epoch, model=model, beta=0.1, random_state=seed)
+    elif name in sketches:
+        selected = method_fn(cg, None, budget, model=model, random_state=seed)
+    else:
+        selected = method_fn(cg, None, budget=budget)
+    return selected, 'spread', _mean_spread(cg, selected, model, epoch, seed)
+
+
+def _maxrss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
 
+
+def _child(conn, job, budget, epoch):
+    # runs in the forked process and sends back one row; the forked process
+    # starts with the pages of the parent, so its peak is taken relative to
+    # the peak right after the fork
+    baseline = _maxrss_mb()
+    start = time.perf_counter()
+    row = {'status': 'ok', 'error': ''}
+    try:
+        selected, metric, value = _run_job(job, budget, epoch)
+        row.update(metric=metric, value=value, selected=' '.join(map(str, selected or [])))
+    except Exception as e:
+        row.update(status='error', error=f"{type(e).__name__}: {e}")
+        traceback.print_exc()
+    row['wall_time'] = time.perf_counter() - start
+    row['peak_memory_mb'] = _maxrss_mb() - baseline
+    conn.send(row)
+    conn.close()
+
+
+def jobs(graph, diffusion, method, eval, seeds=(0,)):
+    """
+    The (graph x method x diffusion x seed) grid as (eval, graph_fn,
+    method_fn, diffusion_fn, seed) jobs. netsleuth does not depend on the
+    diffusion model and gets one job per graph and seed; IMM and OPIM_C
+    have no RR sets for the threshold model of LT and skip it.
+    """
+    grid = []
     for graph_fn in graph:
-        try:
-            print(graph_fn.__name__)
-            g, config = graph_fn()
-            print(g)
-            seeds = random.sample(list(g.nodes()), 10)
+        for method_fn in method:
+            models = [None] if _name(method_fn) == 'netsleuth' else diffusion
+            for diffusion_fn in models:
+                if _name(method_fn) in sketches and _name(diffusion_fn) == 'LT':
+                    continue
+                for seed in seeds:
+                    grid.append((eval, graph_fn, method_fn, diffusion_fn, seed))
+    return grid
+
+
+def _key(job):
+    eval, graph_fn, method_fn, diffusion_fn, seed = job
+    graph_key = getattr(graph_fn, 'key', '')
+    return (eval, _name(graph_fn), graph_key, _name(method_fn), _name(diffusion_fn), int(seed))
+
+
+def _load(path):
+    # finished rows of an earlier run, the last row of every job wins
+    if path.endswith('.parquet'):
+        table = pd.read_parquet(path)
+    else:
+        table = pd.read_csv(path, keep_default_na=False, dtype={'graph': str, 'graph_key': str})
+    # files written before graph_key was a column
+    if 'graph_key' not in table:
+        table['graph_key'] = ''
+    return table.drop_duplicates(KEYS, keep='last')
+
 
-            for method_fn in method:
+def run(graph, diffusion, method, eval, epoch, budget, output=(), seeds=(0,), workers=1, timeout=None,
+        path=None):
+    """
+    Run every job of the (graph x method x diffusion x seed) grid and return
+    the results table, one row per job with its status, wall time, peak
+    memory (how far the resident set of its process grew, in MB) and
+    metric: the mean spread of the selected seeds for eval='im',
+    the drop in spread they cause as blocked nodes for eval='ibm', and the
+    distance of the top source for netsleuth.
+
+    Jobs run in forked processes, workers at a time; a job running longer
+    than timeout seconds is killed. Nothing is written by default; with
+    'csv' or 'parquet' in output the table is kept up to date in
+    path + '.csv' or '.parquet' while jobs finish, and jobs already finished
+    there are skipped, so an interrupted sweep resumes where it stopped.
+    """
+    print("Running " + eval.upper() + " :")
+    kinds = [kind for kind in ('csv', 'parquet') if kind in output]
+    if kinds and path is None:
+        raise ValueError("writing the results as " + " and ".join(kinds) + " needs a path")
+    files = [path + '.' + kind for kind in kinds]
+    grid = jobs(graph, diffusion, method, eval, seeds)
+
+    done = pd.DataFrame(columns=KEYS)
+    if files and os.path.exists(files[0]):
+        done = _load(files[0])
+        done = done[done['status'] == 'ok']
+    finished = set(done[KEYS].itertuples(index=False, name=None))
+    pending = [job for job in grid if _key(job) not in finished]
+    rows = done.to_dict('records')
+
+    def record(job, row):
+        row = dict(zip(KEYS, _key(job)), **row)
+        print(f"{row['graph']} {row['method']} {row['diffusion']} {row['seed']}: {row['status']}"
+              f" {row.get('metric', '')} {row.get('value', '')}")
+        rows.append(row)
+        for file in files:
+            if file.endswith('.csv'):
+                pd.DataFrame([row], columns=COLUMNS).to_csv(file, mode='a', header=not os.path.exists(file), index=False)
+            else:
+                pd.DataFrame(rows, columns=COLUMNS).to_parquet(file, index=False)
+
+    ctx = multiprocessing.get_context('fork')
+    running = {}
+    while pending or running:
+        while pending and len(running) < max(1, workers):
+            job = pending.pop(0)
+            receive, send = ctx.Pipe(duplex=False)
+            process = ctx.Process(target=_child, args=(send, job, budget, epoch))
+            process.start()
+            send.close()
+            running[receive] = (job, process, time.perf_counter())
+
+        ready = wait(list(running), timeout=1.0)
+        for conn in list(running):
+            job, process, start = running[conn]
+            if conn in ready:
                 try:
-                    print(method_fn.__name__)
-                    baselines = ['eigen', 'degree', 'pi', 'sigma', 'Netshield', 'IMRank']
-                    if method_fn.__name__ in baselines:
-                        sims = method_fn(g, config, budget=10)
-                    baselines = ['RIS']
-                    if method_fn.__name__ in baselines:
-                        sims = method_fn(g, config, budget=10)
-                    baselines = ['greedy', 'celf', 'celfpp']
-                    if method_fn.__name__ in baselines:
-                        for diffusion_fn in diffusion:
-                            try:
-                                print(diffusion_fn.__name__)
-                                if eval == 'im':
-                                    sims = method_fn(g, config, budget, rounds=epoch, model=diffusion_fn.__name__, beta=0.1)
-                                if eval == 'ibm':
-                                    sims = method_fn(g, config, budget, seeds, rounds=epoch, model=diffusion_fn.__name__, beta=0.1)
-                            except Exception as e:
-                                print(f"Error when calling {diffusion_fn.__name__}: {str(e)}")
-
-                    if method_fn.__name__ == 'netsleuth':
-                        # todo seed shoule be changable
-                        seed = 10
-                        random.seed(seed)
-                        np.random.seed(seed)
-
-                        contagion = co.StaticNetworkContagion(
-                            G=g,
-                            model="si",
-                            infection_rate=0.1,
-                            # recovery_rate=0.005, # for SIS/SIR models
-                            number_infected = 2,
-                            seed=seed
-                        )
-
-                        contagion.forward(steps = 16)
-                        
-                        step = 15
-
-                        # This obtains the indices of all vertices in the infected category at the 15th step of the simulation.
-                        I = contagion.get_infected_subgraph(step=step)
-                        print(I)
-                        sims = method_fn(I=I, G=g, hypotheses_per_step=1)
-                        true_source = contagion.get_source()
-                        evals = sims.evaluate(true_source)
-                        top_dis= evals["distance"]["top score's distance"]
-                        print(top_dis)
-                        
-                except Exception as e:
-                    print(f"Error when calling {method_fn.__name__}: {str(e)}")    
-
-        except Exception as e:
-            print(f"Error when calling {graph_fn.__name__}: {str(e)}")
\ No newline at end of file
+                    row = conn.recv()
+                except EOFError:
+                    row = {'status': 'error', 'error': f'exit code {process.exitcode}',
+                           'wall_time': time.perf_counter() - start}
+            elif timeout is not None and time.perf_counter() - start > timeout:
+                process.kill()
+                row = {'status': 'timeout', 'error': '', 'wall_time': time.perf_counter() - start}
+            else:
+                continue
+            process.join()
+            conn.close()
+            del running[conn]
+            record(job, row)
+
+    return pd.DataFrame(rows, columns=COLUMNS)